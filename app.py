@@ -2,11 +2,18 @@ import time
 import tkinter as tk
 from typing import Dict
 
+import utils
 from config import Config, AppState
 from frames.game_play import GamePlay
 from frames.game_setup import GameSetup
 from frames.menu import Menu
+from game_components.renderer import render_layers
+from logic import ai
 from logic.input import Input
+from tkinter_components.ProfilerOverlay import ProfilerOverlay
+from toolkit.profiler import profiler
+from toolkit.render_queue import render_queue
+from toolkit.scheduler import FixedStepScheduler
 
 
 class App(tk.Tk):
@@ -24,6 +31,10 @@ class App(tk.Tk):
         self.configure(bg=Config.main_bg_color)
         self.option_add("*font", Config.default_font)
 
+        # decode assets in background while frames are being built
+        utils.asset_pool.bind(self)
+        self.__prefetch_assets()
+
         # init frames
         menu = Menu(self)
         menu.pack(fill="both", expand=True)
@@ -33,36 +44,78 @@ class App(tk.Tk):
         game_setup.pack_forget()
         self.frames[AppState.GAME_SETUP] = game_setup
 
-        game_play = GamePlay(self)
-        game_play.pack_forget()
-        self.frames[AppState.GAME_PLAY] = game_play
-
         # bind input handler
         Input.bind(self)
 
         # start custom loop
+        self.scheduler = FixedStepScheduler(Config.phys_step_rate, Config.render_rate, Config.max_steps_per_tick)
+        self.scheduler.reset()
+        profiler.enabled = Config.profiling
+        render_queue.enabled = Config.render_batching
+        self.profiler_overlay = ProfilerOverlay(self, profiler, self.scheduler)
         self.after(1, self.custom_update)
-        self.last_time = time.perf_counter()
 
     def setState(self, state: AppState):
         if not Config.state_transition(self.state, state):
             return
 
         if state == AppState.QUIT:
+            utils.asset_pool.shutdown()
+            ai.shutdown()
             self.destroy()
             return
 
-        # TODO: temp setup override
-        if state == AppState.GAME_SETUP:
-            state = AppState.GAME_PLAY
+        if state == AppState.GAME_PLAY and state not in self.frames:
+            # built on entering, so that the match uses the settings chosen in game setup
+            setup: GameSetup = self.frames[AppState.GAME_SETUP]
+            self.frames[state] = GamePlay(self, setup.player_count, Config.game_seed,
+                                          npc_count=min(setup.npc_count, setup.player_count),
+                                          difficulty=setup.difficulty)
 
         self.frames[self.state].pack_forget()
         self.frames[state].pack(fill="both", expand=True)
         self.state = state
 
+    def destroy(self):
+        if Config.profiling and Config.profile_path is not None:
+            profiler.dump(Config.profile_path)
+        ai.shutdown()
+        super().destroy()
+
+    @staticmethod
+    def __prefetch_assets():
+        """Start preparing images used by frames, arguments have to match those used by the frames."""
+        utils.prefetch_image(Config.res_path_logo, width=min(600, Config.screen_w - 2 * Config.screen_pad_x))
+        utils.prefetch_image(Config.res_path_btn_idle, width=Config.button_w)
+        utils.prefetch_image(Config.res_path_btn_down, width=Config.button_w)
+        for path in [Config.res_path_green_arrow_idle, Config.res_path_green_arrow_down,
+                     Config.res_path_red_arrow_idle, Config.res_path_red_arrow_down]:
+            utils.prefetch_image(path, width=Config.arrow_w)
+            utils.prefetch_image(path, width=Config.arrow_w, flip_h=True)
+        utils.prefetch_image(Config.res_path_skytex, width=Config.screen_w)
+        utils.prefetch_image(Config.res_path_tank_base, width=Config.tank_w)
+        utils.prefetch_image(Config.res_path_tank_cannon, width=Config.cannon_w)
+        utils.prefetch_image(Config.res_path_ball, width=Config.ball_w)
+
     def custom_update(self):
-        next_time = time.perf_counter()
-        self.frames[self.state].custom_update(next_time - self.last_time)
-        self.last_time = next_time
+        frame = self.frames[self.state]
 
-        self.after(1, self.custom_update)
+        tick_start = time.perf_counter()
+        steps = self.scheduler.advance(tick_start)
+        for _ in range(steps):
+            Input.custom_update(self.scheduler.step)
+            frame.custom_update(self.scheduler.step)
+
+        update_end = time.perf_counter()
+        frame.custom_render(self.scheduler.alpha)
+
+        render_layers.restack()
+        render_queue.flush()
+
+        render_end = time.perf_counter()
+        self.scheduler.record(steps, update_end - tick_start, render_end - update_end)
+        profiler.end_frame(render_end)
+        if Config.profiling:
+            self.profiler_overlay.custom_render()
+
+        self.after(self.scheduler.next_delay(render_end), self.custom_update)
@@ -0,0 +1,61 @@
+"""
+Run benchmark scenarios headlessly and output results as JSON.
+
+Usage: python -m benchmarks [--scenario NAME ...] [--seed 0] [--repeat 20] [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.harness import quiet
+from benchmarks.scenarios import SCENARIOS
+from config import Config
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run benchmark scenarios and output results as JSON.")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="scenario to run, may be repeated, all scenarios are run by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="number of measured repetitions per case")
+    parser.add_argument("--output", help="file to write results into, stdout by default")
+    args = parser.parse_args()
+
+    Config.headless = True
+    names = args.scenario or list(SCENARIOS)
+    results = {
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "scenarios": {},
+    }
+    for name in names:
+        print("Running", name, file=sys.stderr)
+        with quiet():
+            results["scenarios"][name] = SCENARIOS[name](args.seed, args.repeat)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import contextlib
+import io
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize timing samples in seconds into statistics in milliseconds."""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        "samples": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure(fn: Callable[[], None], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """
+    Time repeated calls of fn.
+    :param fn: Function to measure, called without arguments.
+    :param repeat: Number of measured calls.
+    :param warmup: Number of calls done before measuring.
+    :return: Statistics of call durations, see summarize().
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow output printed by game code, so that it does not mix with benchmark results."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
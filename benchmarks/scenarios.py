@@ -0,0 +1,226 @@
+"""
+Benchmark scenarios of the hot paths of the game.
+Every scenario is seeded, so that repeated runs measure the same work.
+"""
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+import utils
+from benchmarks.harness import measure
+from config import Config
+from game_components.collider import CircleCollider
+from game_components.projectile import Projectile, ProjectileSystem, integrate
+from logic import ballistics, simulation, terrain
+from toolkit.vector import Vector2
+
+
+def terrain_generation(seed: int, repeat: int) -> Dict[str, Any]:
+    """Generation of terrain maps of increasing size."""
+    results = {}
+    for w, h in [(800, 600), (1920, 1080), (3840, 1080)]:
+        results[f"{w}x{h}"] = measure(lambda: terrain.generate(w, h, seed=seed), repeat)
+    return results
+
+
+def projectile_physics(seed: int, repeat: int) -> Dict[str, Any]:
+    """Integration step of N projectiles, alone and including collider synchronization."""
+    step = 1.0 / Config.phys_step_rate
+    results = {}
+    for n in [1, 10, 100, 1000]:
+        rng = np.random.default_rng(seed)
+        system = ProjectileSystem()
+        for _ in range(n):
+            system.add(None, Vector2(*rng.uniform(0, Config.screen_w, 2)), Vector2(*rng.uniform(-100, 100, 2)),
+                       Config.cannonball_k * Config.ball_w * Config.ball_w)
+        results[f"step_{n}"] = measure(lambda: system.step(step), repeat)
+
+        game = simulation.create_game(seed=seed)
+        for _ in range(n):
+            # launched upwards from above the terrain, so that nothing is destroyed while measuring
+            pos = Vector2(rng.uniform(100, Config.screen_w - 100), rng.uniform(50, 100))
+            Projectile(game, pos, Vector2(rng.uniform(-50, 50), rng.uniform(-100, -50)))
+        results[f"update_{n}"] = measure(lambda: game.projectiles.custom_update(step), repeat)
+        game.destroy()
+    return results
+
+
+def collision(seed: int, repeat: int) -> Dict[str, Any]:
+    """Collision checks of K trigger colliders scattered over the screen, including terrain."""
+    step = 1.0 / Config.phys_step_rate
+    results = {}
+    for k in [10, 100, 500]:
+        rng = np.random.default_rng(seed)
+        game = simulation.create_game(seed=seed)
+        colliders = [CircleCollider(game,
+                                    Vector2(rng.uniform(10, Config.screen_w - 10),
+                                            rng.uniform(10, Config.screen_h - 10)),
+                                    Config.ball_w / 2, is_trigger=True)
+                     for _ in range(k)]
+
+        def update():
+            for collider in colliders:
+                collider.custom_update(step)
+
+        results[f"colliders_{k}"] = measure(update, repeat)
+        game.destroy()
+    return results
+
+
+def sprite_rotation(seed: int, repeat: int) -> Dict[str, Any]:
+    """Loading a sprite at all 360 rotations with cold and warm cache, and building a rotation atlas."""
+    Config.headless = True
+    rotations = list(np.random.default_rng(seed).permutation(360))
+
+    def load_all():
+        for degrees in rotations:
+            utils.load_photo(Config.res_path_tank_cannon, width=Config.cannon_w, rotate=int(degrees))
+
+    def load_cold():
+        utils.image_cache.clear()
+        utils.photo_cache.clear()
+        load_all()
+
+    def build_atlas():
+        utils.atlas_cache.clear()
+        utils.load_atlas(Config.res_path_tank_cannon, width=Config.cannon_w, step=3)
+
+    results = {"cold_360": measure(load_cold, repeat, warmup=0)}
+    load_all()
+    results["warm_360"] = measure(load_all, repeat)
+    results["atlas_build_step_3"] = measure(build_atlas, repeat, warmup=0)
+    return results
+
+
+def game_frame(seed: int, repeat: int) -> Dict[str, Any]:
+    """Full frames of a headless match, i.e. a simulation step followed by rendering, with shots being fired."""
+    step = 1.0 / Config.phys_step_rate
+    results = {}
+    for player_count in [2, 8]:
+        rng = np.random.default_rng(seed)
+        game = simulation.create_game(player_count, seed=seed)
+        frame = 0
+
+        def update():
+            nonlocal frame
+            if frame % 30 == 0:
+                tank = game.tanks[frame // 30 % player_count]
+                tank.cannon_angle = float(rng.uniform(20, 160))
+                tank.fire()
+            game.custom_update(step)
+            game.custom_render(1.0)
+            frame += 1
+
+        results[f"players_{player_count}"] = measure(update, repeat * 10)
+        game.destroy()
+    return results
+
+
+def vector_allocations(seed: int, repeat: int) -> Dict[str, Any]:
+    """
+    Vector2 instances created and memory allocated per frame by tanks, projectiles and sprite renderers.
+    Allocations are counted on separate untimed runs, so that tracing does not distort timings of the other scenarios.
+    """
+    step = 1.0 / Config.phys_step_rate
+    rng = np.random.default_rng(seed)
+    game = simulation.create_game(seed=seed)
+    tank = game.tanks[0]
+    for _ in range(50):
+        pos = Vector2(rng.uniform(100, Config.screen_w - 100), rng.uniform(50, 100))
+        Projectile(game, pos, Vector2(rng.uniform(-50, 50), rng.uniform(-100, -50)))
+    frame = 0
+
+    def tank_frame():
+        nonlocal frame
+        tank.aim_plus()
+        if frame % 2 == 0:
+            tank.move_right()
+        else:
+            tank.move_left()
+        tank.custom_update(step)
+        tank.custom_render(1.0)
+        frame += 1
+
+    def projectile_frame():
+        game.projectiles.custom_update(step)
+        game.projectiles.custom_render(0.5)
+
+    def renderer_frame():
+        for i, projectile in enumerate(game.projectiles.projectiles):
+            projectile.renderer.position = Vector2(i, frame)
+            projectile.renderer.custom_render()
+
+    results = {}
+    for name, fn in [("tank", tank_frame), ("projectiles_50", projectile_frame), ("renderers_50", renderer_frame)]:
+        fn()
+        created = 0
+        init = Vector2.__init__
+
+        def counting_init(self, *args):
+            nonlocal created
+            created += 1
+            init(self, *args)
+
+        Vector2.__init__ = counting_init
+        tracemalloc.start()
+        try:
+            for _ in range(repeat):
+                fn()
+            allocated, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            Vector2.__init__ = init
+
+        results[name] = {
+            "vectors_per_frame": created / repeat,
+            "traced_peak_bytes": peak,
+            "time": measure(fn, repeat),
+        }
+    game.destroy()
+    return results
+
+
+def ballistic_queries(seed: int, repeat: int) -> Dict[str, Any]:
+    """Building a trajectory table and querying it, compared to predicting a shot by stepping the integrator."""
+    results = {}
+    game = simulation.create_game(seed=seed)
+    tank = game.tanks[0]
+    solver = tank.solver
+    trajectories = solver.trajectories
+    pivot = tank.pivot()
+    drag = Config.cannonball_k * Config.ball_w * Config.ball_w
+
+    cannon_length = tank.tank_cannon.size.x
+    results["table_build"] = measure(lambda: ballistics.TrajectoryTable(tank.projectile_speed, drag, cannon_length,
+                                                                        trajectories.step, trajectories.steps,
+                                                                        trajectories.resolution), repeat)
+    results["landing"] = measure(lambda: solver.landing(pivot, 45.5), repeat)
+    results["sweep"] = measure(lambda: (solver.invalidate(), solver.sweep(pivot)), repeat)
+    solver.sweep(pivot)
+    results["angles_to_hit"] = measure(lambda: solver.angles_to_hit(pivot, game.tanks[1].pos.x), repeat)
+
+    def stepped():
+        direction = np.array([[np.cos(np.radians(45.5)), -np.sin(np.radians(45.5))]])
+        pos = np.array([pivot]) + direction * cannon_length
+        vel = direction * tank.projectile_speed
+        for _ in range(trajectories.steps):
+            integrate(pos, vel, np.array([drag]), trajectories.step)
+            if pos[0, 1] >= game.terrain.height_at(int(pos[0, 0])):
+                break
+
+    results["landing_stepped"] = measure(stepped, repeat)
+    game.destroy()
+    return results
+
+
+SCENARIOS: Dict[str, Callable[[int, int], Dict[str, Any]]] = {
+    "terrain": terrain_generation,
+    "projectiles": projectile_physics,
+    "collision": collision,
+    "sprite_rotation": sprite_rotation,
+    "frame": game_frame,
+    "vector_allocations": vector_allocations,
+    "ballistics": ballistic_queries,
+}
+"""All scenarios by name, each is called with seed and number of repetitions"""
@@ -1,4 +1,4 @@
-from enum import Enum, IntEnum
+from enum import Enum, IntEnum, IntFlag
 
 from toolkit.vector import Vector2
 
@@ -7,6 +7,27 @@ class String(Enum):
     Start = 1
     Exit = 2
     NoOfPlayers = 3
+    NoOfNpcs = 4
+    AiDifficulty = 5
+
+
+class Layer(Enum):
+    """Render layers from bottom to top, values are the canvas tags of their items"""
+    SKY = "layer_sky"
+    TERRAIN = "layer_terrain"
+    TANKS = "layer_tanks"
+    PROJECTILES = "layer_projectiles"
+    EFFECTS = "layer_effects"
+    GIZMOS = "layer_gizmos"
+
+
+class CollisionLayer(IntFlag):
+    """Collision layers of colliders, a trigger only tests colliders within the layers of its mask"""
+    DEFAULT = 1
+    TERRAIN = 2
+    TANKS = 4
+    PROJECTILES = 8
+    ALL = DEFAULT | TERRAIN | TANKS | PROJECTILES
 
 
 class AppState(IntEnum):
@@ -37,6 +58,7 @@ class Color(Enum):
 
 class Config:
     debug_mode = False
+    headless = False  # running without display, photos are replaced by utils.HeadlessPhoto
 
     screen_w = 800
     screen_h = 600
@@ -52,10 +74,24 @@ class Config:
     ball_w = 10
     cannon_offset = (8, -10)
 
+    phys_step_rate = 120  # simulation steps per second
+    render_rate = 60  # maximal rendered frames per second
+    max_steps_per_tick = 8  # simulation steps run at most per frame before the game slows down
+
     main_bg_color = "green"
 
     default_font = "lucida 20 bold italic"
 
+    image_cache_budget = 32 * 1024 * 1024  # bytes of processed PIL images kept in memory
+    photo_cache_budget = 32 * 1024 * 1024  # bytes of processed tk.PhotoImages kept in memory
+    atlas_cache_budget = 16 * 1024 * 1024  # bytes of pre-rendered rotation atlases kept in memory
+    asset_workers = 4  # threads preparing images in background
+
+    render_batching = True  # queue canvas mutations and flush them once per frame, see toolkit.render_queue
+    profiling = True  # record timings of hot paths, shown on F3 together with debug gizmos
+    profile_path = "./profile.json"  # file the profiling statistics are written into on exit, or None
+    profiler_font = "courier 10"
+
     res_path_icon = "./res/icon.png"
     res_path_logo = "./res/logo.png"
     res_path_btn_idle = "./res/btn.png"
@@ -75,11 +111,36 @@ class Config:
 
     rgba_earth_top = [74, 86, 106, 255]
     rgba_earth_bot = [41, 47, 56, 255]
+    earth_top_depth = 10  # thickness of the top terrain layer in pixels
 
     pixels_per_meter = 8.0
     phys_gravity = Vector2(0, 9.8)
     air_density = 1.293  # kg/m^3
     cannonball_k = 0.00001
+    crater_radius = 20  # radius of terrain destroyed by a projectile impact in pixels
+    projectile_cull_margin = 20  # distance beyond left, right and bottom screen edge at which projectiles despawn
+    projectile_pool_size = 32  # despawned projectiles kept for reuse
+
+    broadphase_cell_size = 50  # size of collision grid cells in pixels
+
+    npc_count = 1  # players controlled by the AI preselected in game setup, the last ones in turn order
+    ai_difficulty = "Easy"  # difficulty of NPCs preselected in game setup, key of logic.ai.DIFFICULTIES
+    ai_latency = 0.1  # seconds an NPC may search for a shot before taking the best one found
+    ai_workers = 2  # processes searching shots of NPCs, searches run in process if 0 or on a single core
+    ai_coarse_angles = 12  # angles of the quick search an NPC falls back to when it runs out of time
+    ai_deterministic = False  # search without time limit, so that matches replay identically, implied by headless
+    ai_max_flight_time = 10  # seconds after which a predicted shot counts as lost
+
+    ballistics_resolution = 1.0  # degrees between two cached trajectories, queries interpolate between them
+    ballistics_block_size = 64 * 1024  # trajectory points tested at once when predicting landings
+    trajectory_cache_budget = 16 * 1024 * 1024  # bytes of cached trajectory tables
+    trajectory_preview = True  # draw the predicted path of the shot during turn of a human player
+    trajectory_preview_stride = 4  # steps of flight between two points of the previewed path
+    trajectory_preview_color = Color.CYAN.value
+
+    game_seed = None  # seed of matches, random if None
+    replay_path = "./replay.tkr"  # file the last match is recorded into, None disables recording
+    replay_checksum_interval = 60  # simulation steps between two checksums of the match state stored in replays
 
     gizmo_color_primary = Color.MAGENTA.value
     gizmo_color_secondary = Color.MAGENTA_LIGHT.value
@@ -92,6 +153,10 @@ class Config:
         InputKey.SELECT: ['space', 'Enter', 'Return'],
         InputKey.DEBUG: ['f3', 'F3']
     }
+    """Tk keysyms triggering each InputKey, call Input.rebuild_bindings() after changing them"""
+
+    input_repeat_keys = {InputKey.UP, InputKey.DOWN, InputKey.LEFT, InputKey.RIGHT}  # keys repeating while held
+    input_repeat_interval = 1 / 30  # seconds between two repeats of a held key
 
     __state_transitions_matrix = [
         [1, 1, 1, 0, 1],
@@ -111,12 +176,16 @@ class Config:
         "en": {
             String.Start: "Start",
             String.Exit: "Exit",
-            String.NoOfPlayers: "Number of players"
+            String.NoOfPlayers: "Number of players",
+            String.NoOfNpcs: "Number of NPCs",
+            String.AiDifficulty: "AI difficulty"
         },
         "sk": {
             String.Start: "Spustiť",
             String.Exit: "Ukončiť",
-            String.NoOfPlayers: "Počet hráčov"
+            String.NoOfPlayers: "Počet hráčov",
+            String.NoOfNpcs: "Počet NPC",
+            String.AiDifficulty: "Obťažnosť AI"
         }
     }
 
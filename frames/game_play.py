@@ -1,21 +1,15 @@
-import random
 import tkinter as tk
 
-import numpy as np
-
 import utils
-from config import Config
-from game_components.collider import PixelCollider
-from logic import terrain
-from logic.player import Human
-from logic.tank import Tank
+from config import Config, Layer
+from game_components.renderer import render_layers
+from logic import replay
+from logic.game import Game
 from tkinter_components.PlayerInfo import PlayerInfo
-from toolkit.vector import Vector2
-from utils import as_photo
 
 
 class GamePlay(tk.Frame):
-    def __init__(self, master, player_count=2):
+    def __init__(self, master, player_count=2, seed: int | None = None, npc_count=0, difficulty="Easy"):
         super().__init__(master, )
 
         self.menu = tk.Frame(self)
@@ -23,32 +17,28 @@ class GamePlay(tk.Frame):
 
         self.canvas = tk.Canvas(self, width=Config.screen_w, height=Config.screen_h)
         self.canvas.pack()
-        self.canvas.create_image(0, 0, image=utils.load_photo(Config.res_path_skytex, width=Config.screen_w),
-                                 anchor="nw")
-
-        self.map_array = terrain.random_walk(Config.screen_w, Config.screen_h,
-                                             step_func=lambda y, h, x, w: y + random.randint(-1, 1))
-        self.map_photo = as_photo(self.map_array)
-        self.map_photo_id = self.canvas.create_image(0, 0, image=self.map_photo, anchor="nw")
-        self.map_mask = np.sign(self.map_array[:, :, 3]).astype(np.bool)
-        self.map_collider = PixelCollider(self, self.map_mask)
-
-        player_dist = Config.screen_w // (player_count + 1)
-        self.tanks = [Tank(self) for _ in range(player_count)]
-        self.players = [Human(self, tank) for tank in self.tanks]
-        self.player_infos = [PlayerInfo(self.menu, player) for player in self.players]
-        for i in range(player_count):
-            x = player_dist * (i + 1)
-            y = terrain.height_at(self.map_array, x)
-            self.tanks[i].pos = Vector2(x, y)
+        # keep reference, cached photo may be evicted
+        self.sky_photo = utils.load_photo(Config.res_path_skytex, width=Config.screen_w)
+        self.canvas.create_image(0, 0, image=self.sky_photo, anchor="nw", tags=Layer.SKY.value)
+        render_layers.changed(self.canvas, Layer.SKY.value)
+
+        self.game = Game(self.canvas, player_count, seed, npc_count, difficulty)
+        self.recorder = replay.Recorder(Config.replay_path, self.game) if Config.replay_path is not None else None
+
+        self.player_infos = [PlayerInfo(self.menu, player) for player in self.game.players]
         for info in self.player_infos:
             info.pack(side=tk.LEFT)
-        self.active_player = 0
 
-    def custom_update(self, delta: float):
-        self.map_collider.custom_update(delta)
+    def destroy(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        self.game.destroy()
+        super().destroy()
 
-        for player in self.players:
-            player.custom_update(delta)
+    def custom_update(self, delta: float):
+        self.game.custom_update(delta)
+        if self.recorder is not None:
+            self.recorder.custom_update(delta)
 
-        self.players[self.active_player].start_turn()
+    def custom_render(self, alpha: float):
+        self.game.custom_render(alpha)
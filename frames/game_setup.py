@@ -1,19 +1,57 @@
 import tkinter as tk
 
+from config import Config, AppState, String
+from logic.ai import DIFFICULTIES
+from tkinter_components.ImageButton import ImageButton
 from tkinter_components.RangeSelector import RangeSelector
 
 
 class GameSetup(tk.Frame):
-    player_count: tk.IntVar
-
     def __init__(self, master):
-        super().__init__(master)
+        super().__init__(master, width=Config.screen_w, height=Config.screen_h)
+        self.configure(bg=Config.main_bg_color)
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
+        self.grid_columnconfigure(2, weight=1)
+
+        for column, text in enumerate([String.NoOfPlayers, String.NoOfNpcs, String.AiDifficulty]):
+            label = tk.Label(self, text=Config.string(text), bg=Config.main_bg_color)
+            label.grid(column=column, row=0, sticky="nswe", pady=(Config.screen_pad_y, 0))
+
+        players = list(range(Config.min_player_count, Config.max_player_count + 1))
+        self.player_count_selector = RangeSelector(self, players, Config.min_player_count)
+        self.player_count_selector.grid(column=0, row=1, sticky="nswe")
+
+        self.npc_count_selector = RangeSelector(self, list(range(Config.max_player_count + 1)), Config.npc_count)
+        self.npc_count_selector.grid(column=1, row=1, sticky="nswe")
+
+        self.ai_difficulty_selector = RangeSelector(self, list(DIFFICULTIES), Config.ai_difficulty, width=120)
+        self.ai_difficulty_selector.grid(column=2, row=1, sticky="nswe")
+
+        self.startBtn = ImageButton.PackDefault(self, Config.string(String.Start), width=Config.button_w,
+                                                command=self.onStart)
+        self.startBtn.grid(column=0, row=2, columnspan=3, pady=(Config.screen_pad_y, 0))
+
+    @property
+    def player_count(self) -> int:
+        return self.player_count_selector.selected
+
+    @property
+    def npc_count(self) -> int:
+        """Number of players controlled by the AI, may exceed the number of players"""
+        return self.npc_count_selector.selected
+
+    @property
+    def difficulty(self) -> str:
+        """Difficulty of NPCs, key of logic.ai.DIFFICULTIES"""
+        return self.ai_difficulty_selector.selected
+
+    def onStart(self):
+        self.master.setState(AppState.GAME_PLAY)
 
-        self.player_count_selector = RangeSelector(self, list(range(2, 9)), 2)
-        self.player_count_selector.grid(column=0, row=0, sticky="nswe")
+    def custom_update(self, delta: float):
+        return
 
-        self.ai_difficulty_selector = RangeSelector(self, ["Easy", "Medium", "Hard"], "Easy", width=120)
-        self.ai_difficulty_selector.grid(column=1, row=0, sticky="nswe")
\ No newline at end of file
+    def custom_render(self, alpha: float):
+        return
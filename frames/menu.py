@@ -11,7 +11,8 @@ class Menu(tk.Frame):
         self.configure(bg=Config.main_bg_color)
 
         image_width = min(600, Config.screen_w - 2 * Config.screen_pad_x)
-        image = utils.load_photo(Config.res_path_logo, width=image_width)
+        # keep reference, cached photo may be evicted
+        self.banner_image = image = utils.load_photo(Config.res_path_logo, width=image_width)
         self.banner_canvas = tk.Canvas(self, width=image_width, height=image.height(),
                                        bd=0, highlightthickness=0, relief='ridge')
         self.banner_canvas.pack(padx=Config.screen_pad_x, pady=Config.screen_pad_y)
@@ -31,4 +32,7 @@ class Menu(tk.Frame):
         self.master.setState(AppState.QUIT)
 
     def custom_update(self, delta: float):
-        return
\ No newline at end of file
+        return
+
+    def custom_render(self, alpha: float):
+        return
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Hashable, List, Tuple
+
+Bounds = Tuple[float, float, float, float]
+"""Axis aligned bounding box in form (left, top, right, bottom)"""
+
+
+class UniformGrid:
+    """
+    Collision broadphase dividing the screen into a uniform grid of square cells.
+
+    Each entry is stored in every cell its bounding box overlaps, so only entries sharing a cell
+    (and passing an AABB test) are reported as candidates for the narrow phase.
+    Entries without bounds (e.g. terrain covering the whole screen) are kept aside and reported for everyone.
+    Entries outside of the screen are kept in the border cells.
+    Each entry belongs to layers given by a bit mask, queries may be restricted to some layers.
+    Dictionaries are used as ordered sets, so candidates come in insertion order regardless of hashing.
+    """
+
+    def __init__(self, width: int, height: int, cell_size: int):
+        self.cell_size = cell_size
+        self.cols = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(height / cell_size))
+        self._cells: List[Dict[Hashable, None]] = [{} for _ in range(self.cols * self.rows)]
+        self._bounds: Dict[Hashable, Bounds | None] = {}
+        self._ranges: Dict[Hashable, Tuple[int, int, int, int]] = {}
+        self._unbounded: Dict[Hashable, None] = {}
+        self._layers: Dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, entry: Hashable):
+        return entry in self._bounds
+
+    def __iter__(self):
+        return iter(list(self._bounds))
+
+    def __cell_range(self, bounds: Bounds) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = bounds
+        col0 = min(self.cols - 1, max(0, int(left // self.cell_size)))
+        col1 = min(self.cols - 1, max(0, int(right // self.cell_size)))
+        row0 = min(self.rows - 1, max(0, int(top // self.cell_size)))
+        row1 = min(self.rows - 1, max(0, int(bottom // self.cell_size)))
+        return col0, row0, col1, row1
+
+    def __cells(self, cell_range: Tuple[int, int, int, int]):
+        col0, row0, col1, row1 = cell_range
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                yield self._cells[row * self.cols + col]
+
+    def insert(self, entry: Hashable, bounds: Bounds | None, layer: int = 1):
+        """
+        Register an entry in the grid.
+        :param entry: Object to register, usually a Collider.
+        :param bounds: Bounding box of the entry, or None if the entry is unbounded.
+        :param layer: Bit mask of layers the entry belongs to.
+        """
+        if entry in self._bounds:
+            self.remove(entry)
+
+        self._bounds[entry] = bounds
+        self._layers[entry] = int(layer)
+        if bounds is None:
+            self._unbounded[entry] = None
+            return
+
+        cell_range = self.__cell_range(bounds)
+        self._ranges[entry] = cell_range
+        for cell in self.__cells(cell_range):
+            cell[entry] = None
+
+    def update(self, entry: Hashable, bounds: Bounds | None):
+        """Update bounds of an already registered entry, moving it between cells only if necessary."""
+        old_range = self._ranges.get(entry)
+        if bounds is None or old_range is None:
+            self.insert(entry, bounds, self._layers.get(entry, 1))
+            return
+
+        self._bounds[entry] = bounds
+        new_range = self.__cell_range(bounds)
+        if new_range == old_range:
+            return
+
+        for cell in self.__cells(old_range):
+            del cell[entry]
+        for cell in self.__cells(new_range):
+            cell[entry] = None
+        self._ranges[entry] = new_range
+
+    def remove(self, entry: Hashable):
+        """Unregister an entry, does nothing if the entry is not registered."""
+        if entry not in self._bounds:
+            return
+        del self._bounds[entry]
+        del self._layers[entry]
+        self._unbounded.pop(entry, None)
+        cell_range = self._ranges.pop(entry, None)
+        if cell_range is not None:
+            for cell in self.__cells(cell_range):
+                del cell[entry]
+
+    def candidates(self, entry: Hashable, mask: int = -1) -> List[Hashable]:
+        """
+        Get all entries potentially colliding with the specified entry, excluding the entry itself.
+        Bounded entries are only reported if their bounding boxes overlap.
+        :param mask: Bit mask of layers to report entries of, all layers by default.
+        """
+        # plain int, bitwise operations of flag enums are much slower
+        mask = int(mask)
+        layers = self._layers
+        bounds = self._bounds[entry]
+        if bounds is None:
+            return [other for other in self._bounds if other is not entry and layers[other] & mask]
+
+        left, top, right, bottom = bounds
+        result = {other: None for other in self._unbounded if layers[other] & mask}
+        for cell in self.__cells(self._ranges[entry]):
+            for other in cell:
+                if other is entry or other in result or not layers[other] & mask:
+                    continue
+                o_left, o_top, o_right, o_bottom = self._bounds[other]
+                if o_right < left or right < o_left or o_bottom < top or bottom < o_top:
+                    continue
+                result[other] = None
+        return list(result)
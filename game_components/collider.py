@@ -1,57 +1,159 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+import functools
+import math
+import tkinter as tk
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Tuple, Type
 
 import numpy as np
 
 import toolkit.canvas
 import utils
-from config import Config
+from config import CollisionLayer, Config, Layer
+from game_components.broadphase import Bounds, UniformGrid
 from game_components.renderer import SpriteRenderer
 from toolkit.event import Event
+from toolkit.profiler import profiler
+from toolkit.render_queue import render_queue
 from toolkit.vector import Vector2, PartialVector2
 
 if TYPE_CHECKING:
-    from frames.game_play import GamePlay
+    from logic.game import Game
 
-_active_colliders = []
+def create_broadphase() -> UniformGrid:
+    """Create broadphase for all colliders of a game, colliders register on creation and update it on position change."""
+    return UniformGrid(Config.screen_w, Config.screen_h, Config.broadphase_cell_size)
+
+
+class Contact(NamedTuple):
+    """Result of a narrow-phase test able to locate the contact, truthy like a successful boolean test."""
+    point: Vector2
+    """Centroid of the overlapping area"""
+    normal: Vector2
+    """Unit vector from the contact point towards the tested collider, i.e. direction to push it out"""
+    position: Vector2
+    """Position of the tested collider at the moment of contact, differs from its position for swept tests"""
+
+
+@functools.lru_cache(maxsize=32)
+def disc_stencil(radius: float) -> np.ndarray:
+    """Boolean mask of shape (2R+1, 2R+1), R being radius rounded up, of pixels within radius from the center pixel."""
+    r = math.ceil(radius)
+    dy, dx = np.ogrid[-r:r + 1, -r:r + 1]
+    return dx * dx + dy * dy <= radius * radius
 
 
 class Collider:
+    # region position: Vector2 { get; set }
+    _position: Vector2
+
+    @property
+    def position(self) -> Vector2:
+        """Position of the collider, owned by it and updated in place, copy it to keep a previous position"""
+        return self._position
+
+    @position.setter
+    def position(self, value: Vector2):
+        self.move_to(value.x, value.y)
+
+    def move_to(self, x: float, y: float):
+        """Set position from coordinates, without creating a vector."""
+        self._position.x = x
+        self._position.y = y
+        self.game.colliders.update(self, self.bounds())
+
+    # endregion
+
+    # region enabled: bool { get; set }
+    @property
+    def enabled(self) -> bool:
+        """Flag whether collider takes part in collision checks, disabled colliders are kept for reuse"""
+        return self in self.game.colliders
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        if self.enabled == value:
+            return
+        if value:
+            self.game.colliders.insert(self, self.bounds(), self.collision_layer)
+        else:
+            self.game.colliders.remove(self)
+            if self.gizmo is not None:
+                self.gizmo.disable()
+
+    # endregion
+
+    _narrow_phase: Dict[Tuple[Type[Collider], Type[Collider]], Callable[[Collider, Collider], bool | Contact]] = {}
+    """Collision tests for each pair of collider types, filled in once all collider types are defined"""
 
-    def __init__(self, game: GamePlay, position: Vector2, is_trigger: bool = False):
+    contact: Contact | None = None
+    """Contact of the collision being handled, if the test of the colliding pair locates contacts"""
+
+    def __init__(self, game: Game, position: Vector2, is_trigger: bool = False,
+                 collision_layer: CollisionLayer = CollisionLayer.DEFAULT,
+                 collision_mask: CollisionLayer = CollisionLayer.ALL):
+        """
+        :param collision_layer: Layers the collider belongs to.
+        :param collision_mask: Layers of colliders a trigger collider is tested against.
+        """
         self.game = game
         self.gizmo = None
-        self.position = position
+        self._position = Vector2(position)
         self.is_trigger = is_trigger
+        self.collision_layer = collision_layer
+        self.collision_mask = collision_mask
         self.collided = Event()
-        _active_colliders.append(self)
+        game.colliders.insert(self, self.bounds(), collision_layer)
 
     def __del__(self):
-        assert self in _active_colliders
-        _active_colliders.remove(self)
+        self.game.colliders.remove(self)
 
-    def custom_update(self, delta: float):
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def destroy(self):
+        """Unregister collider from collision checks and remove its gizmo."""
+        self.game.colliders.remove(self)
         if self.gizmo is not None:
-            if Config.debug_mode and self.gizmo.enabled:
-                self.gizmo.position = self.position
-                self.gizmo.custom_update(delta)
-            elif Config.debug_mode and not self.gizmo.enabled:
-                self.gizmo.enable()
-            elif not Config.debug_mode and self.gizmo.enabled:
-                self.gizmo.disable()
+            self.gizmo.destroy()
 
+    def bounds(self) -> Bounds | None:
+        """Axis aligned bounding box of the collider, or None if it is unbounded."""
+        return None
+
+    def custom_update(self, delta: float):
         if not self.is_trigger:
             return
-        for other in _active_colliders:
-            if self is other:
-                continue
-            if self.is_colliding(other):
-                print("Collision between", self, other)
-                self.collided(other)
-
-    def is_colliding(self, other: Collider):
-        return False
+        with profiler.section("collision"):
+            for other in self.game.colliders.candidates(self, self.collision_mask):
+                result = self.is_colliding(other)
+                if result:
+                    self.contact = result if isinstance(result, Contact) else None
+                    self.collided(other)
+                    if self not in self.game.colliders:
+                        # destroyed by a collision handler
+                        return
+
+    def custom_render(self, alpha: float):
+        if self.gizmo is None:
+            return
+        if Config.debug_mode and self.gizmo.enabled:
+            self.gizmo.position = self.position
+            self.gizmo.custom_render(alpha)
+        elif Config.debug_mode and not self.gizmo.enabled:
+            self.gizmo.enable()
+        elif not Config.debug_mode and self.gizmo.enabled:
+            self.gizmo.disable()
+
+    def is_colliding(self, other: Collider) -> bool | Contact | None:
+        """Test collision with other collider, result is truthy on collision and may be a Contact."""
+        if not self.is_trigger:
+            return False
+        test = Collider._narrow_phase.get((type(self), type(other)))
+        return test is not None and test(self, other)
 
     @staticmethod
     def _collision_rect_v_rect(a: RectCollider, b: RectCollider) -> bool:
@@ -67,165 +169,241 @@ class Collider:
 
     @staticmethod
     def _collision_rect_v_circle(rect: RectCollider, circle: CircleCollider) -> bool:
-        interpoint = utils.clamp(circle.position, rect.position - rect.size / 2, rect.position + rect.size / 2)
-        return (interpoint - circle.position).sqr_magnitude <= circle.radius * circle.radius
+        center = circle.position
+        dx = utils.clamp(center.x, rect.position.x, rect.position.x + rect.size.x) - center.x
+        dy = utils.clamp(center.y, rect.position.y, rect.position.y + rect.size.y) - center.y
+        return dx * dx + dy * dy <= circle.radius * circle.radius
 
     @staticmethod
     def _collision_circle_v_circle(a: CircleCollider, b: CircleCollider) -> bool:
-        sqr_dist = (a.position - b.position).sqr_magnitude
+        dx = a.position.x - b.position.x
+        dy = a.position.y - b.position.y
+        sqr_dist = dx * dx + dy * dy
         max_dist = a.radius + b.radius
         return sqr_dist <= max_dist * max_dist
 
     @staticmethod
-    def _collision_rect_v_pixel(rect: RectCollider, pixel: PixelCollider) -> bool:
-        tl = (rect.position - rect.size / 2).as_int()
-        br = (rect.position + rect.size / 2).as_int()
-        tr = Vector2(br.x, tl.y).as_int()
-        bl = Vector2(tl.x, br.y).as_int()
-        # common edge-points check for efficiency
-        if pixel.map[tl.y, tl.x] \
-                or pixel.map[tr.y, tr.x] \
-                or pixel.map[bl.y, bl.x] \
-                or pixel.map[br.y, br.x]:
-            return True
-        return np.any(pixel.map[tl.y:tr.y, tl.x:bl.x])
+    def _collision_rect_v_pixel(rect: RectCollider, pixel: PixelCollider) -> Contact | None:
+        x0, y0 = int(rect.position.x), int(rect.position.y)
+        x1, y1 = int(math.ceil(rect.position.x + rect.size.x)), int(math.ceil(rect.position.y + rect.size.y))
+        window, ox, oy = pixel.window(x0, y0, x1, y1)
+        return PixelCollider.contact(window, ox, oy, rect.position + rect.size / 2, rect.position)
 
     @staticmethod
-    def _collision_circle_v_pixel(circle: CircleCollider, pixel: PixelCollider) -> bool:
-        top = (circle.position - Vector2(0, circle.radius)).as_int()
-        bot = (circle.position + Vector2(0, circle.radius)).as_int()
-        left = (circle.position - Vector2(circle.radius, 0)).as_int()
-        right = (circle.position + Vector2(circle.radius, 0)).as_int()
-        if pixel.map[top.y, top.x] \
-                or pixel.map[left.y, left.x] \
-                or pixel.map[bot.y, bot.x] \
-                or pixel.map[right.y, right.x]:
-            return True
-        # TODO: Proper check
-        return np.any(pixel.map[left.y:right.y, top.x:bot.x])
+    def _collision_circle_v_pixel(circle: CircleCollider, pixel: PixelCollider) -> Contact | None:
+        if circle.sweep_from is None:
+            return pixel.disc_contact(circle.position.x, circle.position.y, circle.radius)
+
+        # sample the path since the previous step densely enough for the disc not to skip any pixel
+        x0, y0 = circle.sweep_from
+        x1, y1 = circle.position.x, circle.position.y
+        samples = max(1, math.ceil(math.hypot(x1 - x0, y1 - y0) / max(circle.radius, 1)))
+        for i in range(samples + 1):
+            t = i / samples
+            contact = pixel.disc_contact(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t, circle.radius)
+            if contact is not None:
+                return contact
+        return None
 
 
 class RectCollider(Collider):
-    def __init__(self, game: GamePlay, position: Vector2, size: Vector2, is_trigger: bool = False, **kwargs):
-        super().__init__(game, position, is_trigger)
+    def __init__(self, game: Game, position: Vector2, size: Vector2, is_trigger: bool = False,
+                 collision_layer: CollisionLayer = CollisionLayer.DEFAULT,
+                 collision_mask: CollisionLayer = CollisionLayer.ALL, **kwargs):
         self.size = size
+        super().__init__(game, position, is_trigger, collision_layer, collision_mask)
         self.gizmo = SpriteRenderer(game.canvas,
                                     self.__draw_gizmo,
                                     position=self.position,
                                     size=PartialVector2(self.size),
                                     anchor=Vector2(),
-                                    **kwargs)
+                                    **{"layer": Layer.GIZMOS, **kwargs})
 
     def custom_update(self, delta: float):
         super().custom_update(delta)
 
-    def is_colliding(self, other: Collider):
-        if not self.is_trigger:
-            return False
-        if isinstance(other, RectCollider):
-            return Collider._collision_rect_v_rect(self, other)
-        elif isinstance(other, CircleCollider):
-            return Collider._collision_rect_v_circle(self, other)
-        elif isinstance(other, PixelCollider):
-            return Collider._collision_rect_v_pixel(self, other)
-        else:
-            return False
+    def custom_render(self, alpha: float):
+        super().custom_render(alpha)
+
+    def bounds(self) -> Bounds | None:
+        return (self.position.x, self.position.y,
+                self.position.x + self.size.x, self.position.y + self.size.y)
 
     def __draw_gizmo(self, renderer: SpriteRenderer, old_ids: List[int]) -> List[int]:
         if old_ids is not None:
-            for old_id in old_ids:
-                renderer.canvas.delete(old_id)
+            render_queue.delete(renderer.canvas, *old_ids)
 
         tl = renderer.position
         br = renderer.position + self.size
         renderer.size = self.size
         return [
-            *toolkit.canvas.draw_xbox(renderer.canvas, renderer.position, self.size, Config.gizmo_color_primary)
+            *toolkit.canvas.draw_xbox(renderer.canvas, renderer.position, self.size, Config.gizmo_color_primary,
+                                      tags=renderer.tags)
         ]
 
 
 class CircleCollider(Collider):
-    def __init__(self, game: GamePlay, position: Vector2, radius: float, is_trigger: bool = False, **kwargs):
-        super().__init__(game, position, is_trigger)
+    def __init__(self, game: Game, position: Vector2, radius: float, is_trigger: bool = False,
+                 collision_layer: CollisionLayer = CollisionLayer.DEFAULT,
+                 collision_mask: CollisionLayer = CollisionLayer.ALL, **kwargs):
         self.radius = radius
+        self.sweep_from: Tuple[float, float] | None = None
+        """Position at the previous step if the collider is tested along its path, see sweep()"""
+        super().__init__(game, position, is_trigger, collision_layer, collision_mask)
         self.gizmo = SpriteRenderer(game.canvas,
                                     self.__draw_gizmo,
                                     position=self.position,
                                     size=Vector2(1, 1) * self.radius * 2,
                                     anchor=Vector2(),
-                                    **kwargs)
+                                    **{"layer": Layer.GIZMOS, **kwargs})
+
+    def sweep(self, x0: float, y0: float, x1: float, y1: float):
+        """Move from (x0, y0) to (x1, y1) and test collisions with pixel maps along the path, not only at its end."""
+        self.sweep_from = (x0, y0)
+        self.move_to(x1, y1)
 
     def custom_update(self, delta: float):
         super().custom_update(delta)
 
-    def is_colliding(self, other: Collider):
-        if not self.is_trigger:
-            return False
-        if isinstance(other, RectCollider):
-            return Collider._collision_rect_v_circle(other, self)
-        elif isinstance(other, CircleCollider):
-            return Collider._collision_circle_v_circle(self, other)
-        elif isinstance(other, PixelCollider):
-            return Collider._collision_circle_v_pixel(self, other)
-        else:
-            return False
+    def custom_render(self, alpha: float):
+        super().custom_render(alpha)
+
+    def bounds(self) -> Bounds | None:
+        return (self.position.x - self.radius, self.position.y - self.radius,
+                self.position.x + self.radius, self.position.y + self.radius)
 
     def __draw_gizmo(self, renderer: SpriteRenderer, old_ids: List[int]) -> List[int]:
         if old_ids is not None:
-            for old_id in old_ids:
-                renderer.canvas.delete(old_id)
+            render_queue.delete(renderer.canvas, *old_ids)
 
         tl = renderer.position - self.radius
         br = renderer.position + self.radius
         renderer.size = Vector2(1, 1) * self.radius * 2
         return [
-            renderer.canvas.create_oval(tl.x, tl.y, br.x, br.y, outline=Config.gizmo_color_primary),
+            renderer.canvas.create_oval(tl.x, tl.y, br.x, br.y, outline=Config.gizmo_color_primary,
+                                        tags=renderer.tags),
             *toolkit.canvas.draw_x(renderer.canvas, renderer.position, int(self.radius / 2),
-                                   Config.gizmo_color_secondary)
+                                   Config.gizmo_color_secondary, tags=renderer.tags)
         ]
 
 
 class PixelCollider(Collider):
 
-    def __init__(self, game: GamePlay, pixelmap: np.ndarray, is_trigger: bool = False, **kwargs):
-        super().__init__(game, Vector2(0, 0), is_trigger)
+    def __init__(self, game: Game, pixelmap: np.ndarray, is_trigger: bool = False,
+                 collision_layer: CollisionLayer = CollisionLayer.DEFAULT,
+                 collision_mask: CollisionLayer = CollisionLayer.ALL, **kwargs):
+        super().__init__(game, Vector2(0, 0), is_trigger, collision_layer, collision_mask)
         self.map = pixelmap
+        self.gizmo_buffer: np.ndarray | None = None
+        """RGBA uint8 texture of the gizmo, built on first draw and then updated region by region"""
+        self.gizmo_photo: tk.PhotoImage | None = None
         self.gizmo = SpriteRenderer(game.canvas,
                                     self.__draw_gizmo,
                                     position=Vector2(0, 0),
                                     size=PartialVector2(Config.screen_w, Config.screen_h),
                                     anchor=Vector2(),
-                                    **kwargs)
-
-    def __del__(self):
-        assert self in _active_colliders
-        _active_colliders.remove(self)
+                                    **{"layer": Layer.GIZMOS, **kwargs})
 
     def custom_update(self, delta: float):
         super().custom_update(delta)
 
-    def is_colliding(self, other: Collider):
-        if not self.is_trigger:
-            return False
-        if isinstance(other, RectCollider):
-            return Collider._collision_rect_v_pixel(other, self)
-        elif isinstance(other, CircleCollider):
-            return Collider._collision_circle_v_pixel(other, self)
-        elif isinstance(other, PixelCollider):
-            raise NotImplementedError("PixelCollider v PixelCollider not implemented.")
-        else:
-            return False
+    def custom_render(self, alpha: float):
+        super().custom_render(alpha)
+
+    def solid(self, x: int, y: int) -> bool:
+        """Whether pixel at coordinates is solid, pixels outside the map are empty."""
+        return 0 <= y < self.map.shape[0] and 0 <= x < self.map.shape[1] and bool(self.map[y, x])
+
+    def window(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[np.ndarray, int, int]:
+        """
+        View of the map within box [x0, x1) x [y0, y1), clipped to the map.
+        :return: The view and coordinates of its top left corner within the map.
+        """
+        h, w = self.map.shape
+        x0, y0 = min(max(x0, 0), w), min(max(y0, 0), h)
+        x1, y1 = min(max(x1, x0), w), min(max(y1, y0), h)
+        return self.map[y0:y1, x0:x1], x0, y0
+
+    def disc_contact(self, x: float, y: float, radius: float) -> Contact | None:
+        """Test a disc centered at (x, y) against the map, pixel by pixel."""
+        r = math.ceil(radius)
+        cx, cy = int(round(x)), int(round(y))
+        window, ox, oy = self.window(cx - r, cy - r, cx + r + 1, cy + r + 1)
+        if not window.any():
+            return None
+        sx, sy = ox - (cx - r), oy - (cy - r)
+        stencil = disc_stencil(radius)[sy:sy + window.shape[0], sx:sx + window.shape[1]]
+        center = Vector2(x, y)
+        return PixelCollider.contact(window & stencil, ox, oy, center, center)
+
+    @staticmethod
+    def contact(hits: np.ndarray, ox: int, oy: int, center: Vector2, position: Vector2) -> Contact | None:
+        """
+        Contact of a shape overlapping the map.
+        :param hits: Solid pixels covered by the shape, within a window of the map.
+        :param ox: X coordinate of the window within the map.
+        :param oy: Y coordinate of the window within the map.
+        :param center: Center of the shape, the normal points towards it.
+        :param position: Position of the collider at the moment of contact.
+        :return: Contact at the centroid of hits, or None if there are none.
+        """
+        if not hits.any():
+            return None
+        ys, xs = np.nonzero(hits)
+        point = Vector2(ox + int(xs.sum()) / len(xs), oy + int(ys.sum()) / len(ys))
+        away = center - point
+        normal = away.normalized if away.sqr_magnitude > 0 else Vector2(0, -1)
+        return Contact(point, normal, position)
+
+    def update_region(self, x0: int, y0: int, x1: int, y1: int):
+        """Update gizmo after the map changed within box [x0, x1) x [y0, y1), transferring only that region."""
+        if self.gizmo_buffer is None:
+            return
+        region = self.gizmo_buffer[y0:y1, x0:x1]
+        region[:, :, 3] = self.map[y0:y1, x0:x1] * 63
+        utils.paste_photo(self.gizmo_photo, region, x0, y0)
 
     def __draw_gizmo(self, renderer: SpriteRenderer, old_ids: List[int]) -> List[int]:
-        if old_ids is not None:
-            for old_id in old_ids:
-                renderer.canvas.delete(old_id)
-
-        print("pixel collider rerender")
-        gizmo_map = np.ones((self.map.shape[0], self.map.shape[1], 4))
-        gizmo_map[:, :, 1] = 255
-        gizmo_map[:, :, 3] = self.map * 63
-        self.gizmo_photo = utils.as_photo(gizmo_map)
+        if self.gizmo_buffer is None:
+            self.gizmo_buffer = np.ones((self.map.shape[0], self.map.shape[1], 4), dtype=np.uint8)
+            self.gizmo_buffer[:, :, 1] = 255
+            self.gizmo_buffer[:, :, 3] = self.map * 63
+            self.gizmo_photo = utils.as_photo(self.gizmo_buffer, "RGBA")
+
+        # the photo is updated in place, an existing item only needs to stay
+        if old_ids is not None and len(old_ids) > 0:
+            return old_ids
         return [
-            renderer.canvas.create_image(0, 0, image=self.gizmo_photo, anchor="nw")
+            renderer.canvas.create_image(0, 0, image=self.gizmo_photo, anchor="nw", tags=renderer.tags)
         ]
+
+
+def _reversed(contact: Contact | None, collider: Collider) -> Contact | None:
+    """Contact seen from the other collider of the pair."""
+    if contact is None:
+        return None
+    return Contact(contact.point, -contact.normal, Vector2(collider.position))
+
+
+def _collision_pixel_v_pixel(a: PixelCollider, b: PixelCollider) -> Contact | None:
+    """Overlap of solid pixels of two maps, both covering the screen from its top left corner."""
+    h = min(a.map.shape[0], b.map.shape[0])
+    w = min(a.map.shape[1], b.map.shape[1])
+    hits = a.map[:h, :w] & b.map[:h, :w]
+    # the normal points from the overlap towards the center of the tested map
+    return PixelCollider.contact(hits, 0, 0, Vector2(a.map.shape[1] / 2, a.map.shape[0] / 2), a.position)
+
+
+Collider._narrow_phase = {
+    (RectCollider, RectCollider): Collider._collision_rect_v_rect,
+    (RectCollider, CircleCollider): Collider._collision_rect_v_circle,
+    (RectCollider, PixelCollider): Collider._collision_rect_v_pixel,
+    (CircleCollider, RectCollider): lambda circle, rect: Collider._collision_rect_v_circle(rect, circle),
+    (CircleCollider, CircleCollider): Collider._collision_circle_v_circle,
+    (CircleCollider, PixelCollider): Collider._collision_circle_v_pixel,
+    (PixelCollider, RectCollider):
+        lambda pixel, rect: _reversed(Collider._collision_rect_v_pixel(rect, pixel), pixel),
+    (PixelCollider, CircleCollider):
+        lambda pixel, circle: _reversed(Collider._collision_circle_v_pixel(circle, pixel), pixel),
+    (PixelCollider, PixelCollider): _collision_pixel_v_pixel,
+}
@@ -1,60 +1,313 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import math
+from typing import TYPE_CHECKING, List
 
-from config import Config
+import numpy as np
+
+from config import CollisionLayer, Config, Layer
 from game_components.collider import Collider, CircleCollider
 from game_components.renderer import SpriteRenderer
-from toolkit.vector import Vector2, PartialVector2
+from toolkit.profiler import profiler
+from toolkit.vector import Vector2, PartialVector2, Vector2Array
 
 if TYPE_CHECKING:
-    from frames.game_play import GamePlay
+    from logic.game import Game
+
+
+def integrate(pos: np.ndarray, vel: np.ndarray, drag: np.ndarray, delta: float):
+    """
+    Integrate gravity, quadratic drag and movement of projectiles by one step, in place.
+    Shared by the simulation and by anything predicting it, so that predictions match exactly.
+    :param pos: Positions of shape (n, 2) in pixels.
+    :param vel: Velocities of shape (n, 2) in pixels per second.
+    :param drag: Quadratic drag coefficients of shape (n,).
+    :param delta: Duration of the step in seconds.
+    """
+    gravity = Config.phys_gravity * Config.pixels_per_meter * delta
+    vel[:, 0] += gravity.x
+    vel[:, 1] += gravity.y
+
+    # drag of magnitude k * |v|^2 against direction of v, i.e. v * k * |v|
+    speed = np.hypot(vel[:, 0], vel[:, 1])
+    vel -= vel * (drag * speed * delta)[:, None]
+
+    pos += vel * delta
+
+
+class ProjectileSystem:
+    """
+    Batch integrator of all live projectiles.
+    Physical state of each projectile is kept in a row of NumPy arrays, so all projectiles are stepped
+    in a single vectorized update, renderers and colliders are synchronized only afterwards.
+    Rows are kept dense, removed projectile is replaced by the last one.
+    Despawned projectiles are kept in a pool, so that firing does not create canvas items and colliders anew.
+    Collisions are first tested for all projectiles at once against the terrain height index and tank bounds,
+    only projectiles that may touch something are then tested by their colliders.
+    """
+
+    prefilter_min = 4
+    """Number of live projectiles from which the vectorized prefilter pays off"""
+
+    def __init__(self, game: Game | None = None, capacity: int = 64):
+        """:param game: Match whose terrain and tanks projectiles collide with, None for integration only."""
+        self.game = game
+        self.count = 0
+        """Number of live projectiles, occupying first `count` rows of the arrays"""
+        self.projectiles: List[Projectile] = []
+        """Live projectiles, projectile at index i owns i-th row of the arrays"""
+        self.pool: List[Projectile] = []
+        """Despawned projectiles ready for reuse, with hidden renderers and disabled colliders"""
+
+        self.pos = np.zeros((capacity, 2))
+        """Positions in pixels"""
+        self.prev_pos = np.zeros((capacity, 2))
+        """Positions before the last step, used to interpolate rendering"""
+        self.vel = np.zeros((capacity, 2))
+        """Velocities in pixels per second"""
+        self.drag = np.zeros(capacity)
+        """Quadratic drag coefficients, cannonball_k scaled by projectile area"""
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def positions(self) -> Vector2Array:
+        """Positions of live projectiles, a view of the system state rather than a copy"""
+        return Vector2Array(self.pos[:self.count])
+
+    @property
+    def velocities(self) -> Vector2Array:
+        """Velocities of live projectiles, a view of the system state rather than a copy"""
+        return Vector2Array(self.vel[:self.count])
+
+    def add(self, projectile: Projectile, pos: Vector2, vel: Vector2, drag: float) -> int:
+        """
+        Register a projectile and its initial state.
+        :return: Index of the row owned by the projectile.
+        """
+        if self.count == len(self.pos):
+            self.__grow(2 * len(self.pos))
+
+        index = self.count
+        self.pos[index] = self.prev_pos[index] = (pos.x, pos.y)
+        self.vel[index] = (vel.x, vel.y)
+        self.drag[index] = drag
+        self.projectiles.append(projectile)
+        self.count += 1
+        return index
+
+    def remove(self, projectile: Projectile):
+        """Unregister a projectile, moving the last projectile into its row."""
+        index = projectile.index
+        last = self.count - 1
+        if index != last:
+            moved = self.projectiles[last]
+            self.pos[index] = self.pos[last]
+            self.prev_pos[index] = self.prev_pos[last]
+            self.vel[index] = self.vel[last]
+            self.drag[index] = self.drag[last]
+            self.projectiles[index] = moved
+            moved.index = index
+        self.projectiles.pop()
+        self.count -= 1
+        projectile.index = -1
+
+    def __grow(self, capacity: int):
+        for name in ["pos", "prev_pos", "vel", "drag"]:
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]))
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def step(self, delta: float):
+        """Integrate gravity, quadratic drag and movement of all live projectiles by one step."""
+        n = self.count
+        if n == 0:
+            return
+        self.prev_pos[:n] = self.pos[:n]
+        integrate(self.pos[:n], self.vel[:n], self.drag[:n], delta)
+
+    def out_of_bounds(self, margin: float = 0) -> np.ndarray:
+        """
+        Indices of live projectiles beyond left, right or bottom screen edge, in descending order.
+        Projectiles above the screen are kept, gravity brings them back.
+        """
+        x = self.pos[:self.count, 0]
+        y = self.pos[:self.count, 1]
+        out = (x < -margin) | (x > Config.screen_w + margin) | (y > Config.screen_h + margin)
+        return np.flatnonzero(out)[::-1]
+
+    def near_terrain(self, heights: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Flags of live projectiles whose path in the last step may have touched the terrain.
+        Conservative, the lowest point of the path is compared with the highest surface of all columns it spans.
+        :param heights: Y coordinate of the terrain surface in each column, see Terrain.heights.
+        :param radius: Radius of the projectiles.
+        """
+        n = self.count
+        r = math.ceil(radius) + 1
+        x0 = np.minimum(self.prev_pos[:n, 0], self.pos[:n, 0])
+        x1 = np.maximum(self.prev_pos[:n, 0], self.pos[:n, 0])
+        bottom = np.maximum(self.prev_pos[:n, 1], self.pos[:n, 1]) + r
+        width = len(heights)
+        start = np.clip(np.floor(x0).astype(np.int64) - r, 0, width - 1)
+        stop = np.clip(np.ceil(x1).astype(np.int64) + r + 1, start + 1, width)
+        # highest surface in columns [start, stop), the appended column lets stop reach the width
+        highest = np.minimum.reduceat(np.append(heights, 0), np.column_stack((start, stop)).ravel())[::2]
+        return (x1 + r >= 0) & (x0 - r < width) & (bottom >= highest)
+
+    def overlapping(self, boxes: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Flags of live projectiles whose path in the last step may have touched any of boxes.
+        :param boxes: Bounding boxes of shape (m, 4) in form (left, top, right, bottom).
+        :param radius: Radius of the projectiles.
+        """
+        n = self.count
+        if len(boxes) == 0:
+            return np.zeros(n, dtype=bool)
+        lo = np.minimum(self.prev_pos[:n], self.pos[:n])[:, np.newaxis, :] - radius
+        hi = np.maximum(self.prev_pos[:n], self.pos[:n])[:, np.newaxis, :] + radius
+        return ((lo[:, :, 0] <= boxes[:, 2]) & (boxes[:, 0] <= hi[:, :, 0]) &
+                (lo[:, :, 1] <= boxes[:, 3]) & (boxes[:, 1] <= hi[:, :, 1])).any(axis=1)
+
+    def custom_update(self, delta: float):
+        with profiler.section("physics"):
+            self.step(delta)
+            # descending, so that rows moved by swap-removal were already checked
+            for index in self.out_of_bounds(Config.projectile_cull_margin).tolist():
+                self.projectiles[index].despawn()
+        if self.count == 0:
+            return
+
+        with profiler.section("collision_prefilter"):
+            near = np.ones(self.count, dtype=bool)
+            if self.game is not None and self.count >= self.prefilter_min:
+                radius = Config.ball_w / 2
+                boxes = np.array([tank.tank_collider.bounds() for tank in self.game.tanks]).reshape(-1, 4)
+                near = self.near_terrain(self.game.terrain.heights, radius) | self.overlapping(boxes, radius)
+        # collision callbacks may remove projectiles
+        for projectile, test in zip(list(self.projectiles), near.tolist()):
+            if projectile.alive:
+                projectile.custom_update(delta, test)
+
+    def custom_render(self, alpha: float):
+        n = self.count
+        positions = self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha
+        for projectile, (x, y) in zip(self.projectiles, positions.tolist()):
+            projectile.renderer.move_to(x, y)
+            projectile.custom_render(alpha)
 
 
 class Projectile:
-    # region position: Vector2 { get; set }
-    _pos: Vector2
+    """Handle of a single projectile, its physical state is stored in the ProjectileSystem."""
 
+    # region position: Vector2 { get; set }
     @property
     def pos(self) -> Vector2:
-        return self._pos
+        x, y = self.system.pos[self.index]
+        return Vector2(float(x), float(y))
 
     @pos.setter
     def pos(self, value: Vector2):
-        if self._pos == value:
-            return
-        self._pos = value
-        self.renderer.position = self._pos
-        self.collider.position = self._pos
+        self.system.pos[self.index] = (value.x, value.y)
+        self.collider.position = value
 
     # endregion
 
-    def __init__(self, game: GamePlay, pos: Vector2, force: Vector2):
-        self._pos = pos
-        self.force = force
+    # region force: Vector2 { get; set }
+    @property
+    def force(self) -> Vector2:
+        """Velocity of the projectile in pixels per second"""
+        x, y = self.system.vel[self.index]
+        return Vector2(float(x), float(y))
+
+    @force.setter
+    def force(self, value: Vector2):
+        self.system.vel[self.index] = (value.x, value.y)
+
+    # endregion
+
+    @property
+    def alive(self) -> bool:
+        """Flag whether projectile is simulated, i.e. it was neither despawned nor destroyed"""
+        return self.index >= 0
+
+    def __init__(self, game: Game, pos: Vector2, force: Vector2):
+        """Create a new projectile, use spawn() to reuse a despawned one if possible."""
+        self.game = game
+        self.system = game.projectiles
         self.renderer = SpriteRenderer(game.canvas,
                                        Config.res_path_ball,
-                                       position=self._pos,
-                                       size=PartialVector2(Config.ball_w, None))
+                                       position=pos,
+                                       size=PartialVector2(Config.ball_w, None),
+                                       layer=Layer.PROJECTILES)
+        # projectiles do not react to each other, so they do not even query each other
         self.collider = CircleCollider(game,
-                                       position=self._pos,
+                                       position=pos,
                                        radius=Config.ball_w / 2,
-                                       is_trigger=True)
+                                       is_trigger=True,
+                                       collision_layer=CollisionLayer.PROJECTILES,
+                                       collision_mask=CollisionLayer.TERRAIN | CollisionLayer.TANKS)
         self.collider.collided.append(self._on_collision)
+        self.index = self.system.add(self, pos, force, Config.cannonball_k * self.renderer.size.area)
 
-    def custom_update(self, delta: float):
-        gravity = Config.phys_gravity * Config.pixels_per_meter * delta
-        self.force += gravity
-        # print("gravity", gravity)
+    @staticmethod
+    def spawn(game: Game, pos: Vector2, force: Vector2) -> Projectile:
+        """Launch a projectile, reusing a despawned one from the pool of the game if available."""
+        if len(game.projectiles.pool) == 0:
+            return Projectile(game, pos, force)
 
-        drag = Config.cannonball_k * self.force.sqr_magnitude * self.renderer.size.area * delta
-        drag = -self.force.normalized * drag
-        self.force += drag
-        # print("drag", drag)
+        projectile = game.projectiles.pool.pop()
+        projectile.renderer.position = pos
+        projectile.renderer.enable()
+        projectile.collider.position = pos
+        projectile.collider.enable()
+        projectile.index = projectile.system.add(projectile, pos, force,
+                                                 Config.cannonball_k * projectile.renderer.size.area)
+        return projectile
 
-        self.pos += self.force * delta
-        self.renderer.custom_update(delta)
+    def despawn(self):
+        """Remove projectile from the simulation and keep it hidden in the pool for reuse, or destroy it if full."""
+        if not self.alive:
+            return
+        if len(self.system.pool) >= Config.projectile_pool_size:
+            self.destroy()
+            return
+        self.system.remove(self)
+        self.renderer.disable()
+        self.collider.disable()
+        self.system.pool.append(self)
+
+    def custom_update(self, delta: float, test_collisions: bool = True):
+        """
+        Synchronize collider with position integrated by the system and check collisions.
+        :param test_collisions: Whether the projectile may have touched anything, see ProjectileSystem.custom_update().
+        """
+        px, py = self.system.prev_pos[self.index].tolist()
+        x, y = self.system.pos[self.index].tolist()
+        if not test_collisions:
+            self.collider.move_to(x, y)
+            return
+        self.collider.sweep(px, py, x, y)
         self.collider.custom_update(delta)
 
+    def custom_render(self, alpha: float):
+        self.renderer.custom_render(alpha)
+        self.collider.custom_render(alpha)
+
+    def destroy(self):
+        """Remove projectile from the simulation, canvas and collision checks."""
+        if self.alive:
+            self.system.remove(self)
+        self.renderer.destroy()
+        self.collider.destroy()
+
     def _on_collision(self, other: Collider):
-        pass
+        if other is not self.game.map_collider:
+            return
+        # carve where the projectile touched the terrain, it may have moved further within the step
+        contact = self.collider.contact
+        x, y = (contact.position.x, contact.position.y) if contact is not None else self.system.pos[self.index]
+        self.game.terrain.carve(x, y, Config.crater_radius)
+        self.despawn()
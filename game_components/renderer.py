@@ -2,12 +2,25 @@ from __future__ import annotations
 
 import tkinter as tk
 from enum import Enum
-from typing import Tuple, Callable, List
+from typing import TYPE_CHECKING, Tuple, Callable, List
+
+import numpy as np
 
 import config
 import toolkit.canvas
 import utils
-from toolkit.vector import Vector2, PartialVector2
+from config import Layer
+from toolkit.layers import RenderLayers
+from toolkit.profiler import profiler
+from toolkit.render_queue import render_queue
+from toolkit.vector import Vector2, PartialVector2, Vector2Array
+
+if TYPE_CHECKING:
+    from logic.terrain import Terrain
+
+
+render_layers = RenderLayers([layer.value for layer in Layer])
+"""Z-order of items of all renderers, restacked by the app before each render queue flush"""
 
 
 class SpriteDrawMode(Enum):
@@ -31,6 +44,16 @@ class SpriteRenderer:
 
     # endregion
 
+    # region moved: bool = False { get }
+    _moved: bool = False
+
+    @property
+    def moved(self) -> bool:
+        """Flag whether gizmo only needs to be moved on canvas, without reloading its image"""
+        return self._moved
+
+    # endregion
+
     # region enabled: bool = True { get; set }
     _enabled: bool = True
 
@@ -45,10 +68,9 @@ class SpriteRenderer:
             return
 
         self._enabled = value
-        if self._enabled:
-            self.enable()
-        else:
-            self.disable()
+        state = "normal" if self._enabled else "hidden"
+        for sprite_id in self._sprite_ids + self._debug_gizmo_ids:
+            render_queue.itemconfigure(self._canvas, sprite_id, state=state)
 
     # endregion
 
@@ -64,9 +86,7 @@ class SpriteRenderer:
     def canvas(self, value: tk.Canvas):
         if self._canvas == value:
             return
-        if len(self._sprite_ids) > 0:
-            for sprite_id in self.sprite_ids:
-                self._canvas.delete(sprite_id)
+        self.destroy()
         self._canvas = value
         self.set_dirty()
 
@@ -119,15 +139,22 @@ class SpriteRenderer:
 
     @property
     def position(self) -> Vector2:
-        """Position of gizmo on canvas, specifically its center"""
-        return Vector2(self._position)
+        """Position of gizmo on canvas, specifically its center, must not be modified in place"""
+        return self._position
 
     @position.setter
     def position(self, value: Vector2):
         if self._position == value:
             return
-        self._position = value
-        self.set_dirty()
+        self._position = Vector2(value)
+        self._moved = True
+
+    def move_to(self, x: float, y: float):
+        """Set position from coordinates, without creating a vector unless the position changes."""
+        if self._position.x == x and self._position.y == y:
+            return
+        self._position = Vector2(x, y)
+        self._moved = True
 
     # endregion
 
@@ -150,7 +177,7 @@ class SpriteRenderer:
     def anchor(self, value: Vector2):
         if self._anchor == value:
             return
-        self.anchor = value
+        self._anchor = value
         self.set_dirty()
 
     # endregion
@@ -208,7 +235,24 @@ class SpriteRenderer:
 
     _draw_mode: SpriteDrawMode
 
+    _drawn_position: Vector2
+    """Position at which the sprite currently is on canvas"""
+
+    _drawn_rotation: float = 0
+    """Rotation of the sprite currently on canvas, differs from rotation when rotation atlas is used"""
+
+    _rotation_step: float | None
+    """Angle between pre-rendered rotations of the sprite, or None to render each rotation on demand"""
+
     _debug_gizmo_ids: List[int] = []
+    _debug_gizmo_position: Vector2 = Vector2(0, 0)
+    """Position at which the debug gizmo was drawn"""
+
+    _offset_key: Tuple[float, float, float, float, float] | None = None
+    """Size, anchor and rotation from which _offset was computed"""
+
+    _offset: Vector2
+    """Offset from anchor to the sprite center for _offset_key"""
 
     def __init__(self,
                  canvas: tk.Canvas,
@@ -217,10 +261,18 @@ class SpriteRenderer:
                  rotation: float = 0,
                  size: PartialVector2 = PartialVector2(None, None),
                  flip: Tuple[bool, bool] = (False, False),
-                 anchor: Vector2 = Vector2(0.5, 0.5)):
+                 anchor: Vector2 = Vector2(0.5, 0.5),
+                 rotation_step: float | None = None,
+                 layer: Layer | None = None):
         self._canvas = canvas
-
-        self._position = position
+        self._rotation_step = rotation_step
+        self.layer = layer
+        """Render layer of the sprite, or None to stay in order of creation"""
+        self._sprite_ids = []
+        self._debug_gizmo_ids = []
+
+        self._position = Vector2(position)
+        self._drawn_position = self._position
         self._rotation = rotation
         self._size = Vector2(0, 0)
         self._flip = flip
@@ -240,7 +292,12 @@ class SpriteRenderer:
         self._dirty = True
 
     def __del__(self):
-        self.disable()
+        self.destroy()
+
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        """Canvas tags to create items of the sprite with, callbacks drawing the sprite should use them too"""
+        return (self.layer.value,) if self.layer is not None else ()
 
     @property
     def box(self):
@@ -252,36 +309,76 @@ class SpriteRenderer:
         self.enabled = True
 
     def disable(self):
-        print("Disable sprite cleanup...")
-        if len(self._sprite_ids) > 0:
-            for sprite_id in self.sprite_ids:
-                self._canvas.delete(sprite_id)
         self.enabled = False
 
-    def custom_update(self, delta: float):
+    def destroy(self):
+        """Remove all items of this renderer from canvas, they are recreated on next update."""
+        render_queue.delete(self._canvas, *self._sprite_ids, *self._debug_gizmo_ids)
+        self._sprite_ids = []
+        self._debug_gizmo_ids = []
+        self._dirty = True
+
+    def custom_render(self, alpha: float = 1.0):
         if not self.enabled:
             return
 
+        reloaded = self._dirty
+        moved = self._moved
         if self._dirty:
             self._dirty = False
+            self._moved = False
+            with profiler.section("sprite_reload"):
+                self.__load_sprite()
+        elif self._moved:
+            self._moved = False
+            with profiler.section("canvas"):
+                self.__move_sprite()
 
-            if len(self._sprite_ids) > 0:
-                for sprite_id in self.sprite_ids:
-                    self._canvas.delete(sprite_id)
-
-            self.__load_sprite()
-
-        if len(self._debug_gizmo_ids) > 0:
-            for gizmo in self._debug_gizmo_ids:
-                self.canvas.delete(gizmo)
-            self._debug_gizmo_ids = []
         if config.Config.debug_mode:
-            topleft = self.abs_pos()
-            self._debug_gizmo_ids = [
-                *toolkit.canvas.draw_x(self.canvas, self.position, 5, "red", width=2),
-                *toolkit.canvas.draw_x(self.canvas, topleft, 3, "orange", width=2),
-                self.canvas.create_line(self.position.x, self.position.y, topleft.x, topleft.y, fill="orange")
-            ]
+            if reloaded or len(self._debug_gizmo_ids) == 0:
+                self.__draw_debug_gizmo()
+            elif moved:
+                # gizmo only follows the sprite, moving its items is cheaper than drawing them anew
+                dx = self._position.x - self._debug_gizmo_position.x
+                dy = self._position.y - self._debug_gizmo_position.y
+                for gizmo in self._debug_gizmo_ids:
+                    render_queue.move(self.canvas, gizmo, dx, dy)
+                self._debug_gizmo_position = self._position
+        elif len(self._debug_gizmo_ids) > 0:
+            render_queue.delete(self.canvas, *self._debug_gizmo_ids)
+            self._debug_gizmo_ids = []
+
+    def __draw_debug_gizmo(self):
+        render_queue.delete(self.canvas, *self._debug_gizmo_ids)
+        self._debug_gizmo_position = self._position
+        topleft = self.abs_pos()
+        tags = Layer.GIZMOS.value
+        self._debug_gizmo_ids = [
+            *toolkit.canvas.draw_x(self.canvas, self.position, 5, "red", width=2, tags=tags),
+            *toolkit.canvas.draw_x(self.canvas, topleft, 3, "orange", width=2, tags=tags),
+            self.canvas.create_line(self.position.x, self.position.y, topleft.x, topleft.y, fill="orange", tags=tags)
+        ]
+        render_layers.changed(self.canvas, tags)
+
+    def __sprite_coords(self) -> Tuple[float, float]:
+        """Canvas coordinates of the sprite center, at which the image item is placed."""
+        key = (self._size.x, self._size.y, self._anchor.x, self._anchor.y, self._drawn_rotation)
+        if key != self._offset_key:
+            # center_offset - anchor_offset, only recomputed when the sprite changes rather than on every move
+            self._offset = (self._size * (Vector2(0.5, 0.5) - self._anchor)).rotated(-self._drawn_rotation)
+            self._offset_key = key
+        return self._position.x + self._offset.x, self._position.y + self._offset.y
+
+    def __move_sprite(self):
+        """Move already drawn items to current position, without recreating them."""
+        if self._draw_mode == SpriteDrawMode.FROM_FILE:
+            if len(self._sprite_ids) > 0:
+                render_queue.coords(self._canvas, self._sprite_ids[0], *self.__sprite_coords())
+        else:
+            offset = self._position - self._drawn_position
+            for sprite_id in self._sprite_ids:
+                render_queue.move(self._canvas, sprite_id, offset.x, offset.y)
+        self._drawn_position = self._position
 
     def __load_sprite(self, override_size: PartialVector2 | None = None):
 
@@ -292,8 +389,41 @@ class SpriteRenderer:
         height = override_size.y if override_size is not None else self._size.y if self._size is not None else None
 
         if self._draw_mode == SpriteDrawMode.CALLBACK:
-            self._sprite_ids = self._sprite_path(self, self._sprite_ids)
+            old_ids = self._sprite_ids
+            self._sprite_ids = self._sprite_path(self, old_ids)
             assert self.size is not None, "SpriteRenderer onSpriteDrawn callback must set renderer.size"
+            if self._sprite_ids is not old_ids and self.layer is not None:
+                render_layers.changed(self._canvas, self.layer.value)
+        elif self._rotation_step is not None:
+            flip_h = self._flip[0] if self._flip is not None else False
+            flip_v = self._flip[1] if self._flip is not None else False
+            if override_size is not None:
+                # deduce full size first, so that the atlas is built only once under its final key
+                image = utils.load_image(self._sprite_path,
+                                         int(height) if height is not None else None,
+                                         int(width) if width is not None else None,
+                                         flip_h, flip_v)
+                self._size = Vector2(image.width, image.height)
+                width, height = self._size.x, self._size.y
+
+            atlas = utils.load_atlas(self._sprite_path,
+                                     int(height) if height is not None else None,
+                                     int(width) if width is not None else None,
+                                     flip_h, flip_v, self._rotation_step)
+            self._sprite = atlas.frame(self._rotation)
+            self._drawn_rotation = atlas.quantize(self._rotation)
+        elif len(self._sprite_ids) > 0:
+            # sprite is already shown, keep it until the new variant is prepared in background
+            sprite = utils.load_photo_async(self._sprite_path,
+                                            int(height) if height is not None else None,
+                                            int(width) if width is not None else None,
+                                            self._flip[0] if self._flip is not None else False,
+                                            self._flip[1] if self._flip is not None else False,
+                                            int(self._rotation) if self._rotation is not None else 0,
+                                            callback=lambda _: self.set_dirty())
+            if sprite is not None:
+                self._sprite = sprite
+                self._drawn_rotation = self._rotation
         else:
             self._sprite = utils.load_photo(self._sprite_path,
                                             int(height) if height is not None else None,
@@ -301,16 +431,22 @@ class SpriteRenderer:
                                             self._flip[0] if self._flip is not None else False,
                                             self._flip[1] if self._flip is not None else False,
                                             int(self._rotation) if self._rotation is not None else 0)
+            self._drawn_rotation = self._rotation
 
-            # cache center_offset and anchor_offset on self.rotation.setter
-            center_offset = (self.size / 2).rotated(-self.rotation)
-            anchor_offset = (self.size * self.anchor).rotated(-self.rotation)
-            self._sprite_ids = [self._canvas.create_image(self._position.x + center_offset.x - anchor_offset.x,
-                                                          self._position.y + center_offset.y - anchor_offset.y,
-                                                          image=self._sprite)]
             if override_size is not None:
                 self._size = Vector2(self._sprite.width(), self._sprite.height())
-                print("SpriteRenderer.__load_sprite _size deduced to", self._size)
+
+        if self._draw_mode == SpriteDrawMode.FROM_FILE:
+            # image item is created once, afterwards only its image and coordinates change
+            x, y = self.__sprite_coords()
+            if len(self._sprite_ids) > 0:
+                render_queue.itemconfigure(self._canvas, self._sprite_ids[0], image=self._sprite)
+                render_queue.coords(self._canvas, self._sprite_ids[0], x, y)
+            else:
+                self._sprite_ids = [self._canvas.create_image(x, y, image=self._sprite, tags=self.tags)]
+                if self.layer is not None:
+                    render_layers.changed(self._canvas, self.layer.value)
+        self._drawn_position = self._position
 
     def abs_pos(self, rel_point: Vector2 = Vector2(0, 0)) -> Vector2:
         """
@@ -323,3 +459,78 @@ class SpriteRenderer:
         point_offset = (self.size * rel_point).rotated(-self.rotation)
         anchor_offset = (self.size * self.anchor).rotated(-self.rotation)
         return self._position - anchor_offset + point_offset
+
+    def abs_points(self, rel_points: Vector2Array) -> Vector2Array:
+        """
+        Get coordinates of many local relative points in absolute space of canvas at once, see abs_pos.
+        @param rel_points: Relative coordinates in sprite, (0, 0) being the top left corner.
+        @return: Coordinates of the points in canvas
+        """
+        anchor_offset = (self.size * self.anchor).rotated(-self.rotation)
+        return (rel_points * self.size).rotated(-self.rotation) + (self._position - anchor_offset)
+
+
+class PathRenderer:
+    """
+    Draws a polyline through points as a single canvas line, e.g. a predicted trajectory.
+    The line is only reconfigured when the points change, and hidden while there are fewer than two of them.
+    """
+
+    def __init__(self, canvas: tk.Canvas, color: str, dash: Tuple[int, ...] = (4, 4), width: int = 1,
+                 layer: Layer = Layer.EFFECTS):
+        self.canvas = canvas
+        self.line_id = canvas.create_line(0, 0, 0, 0, fill=color, dash=dash, width=width, state="hidden",
+                                          tags=layer.value)
+        render_layers.changed(canvas, layer.value)
+        self._coords: List[float] = []
+        """Flat x, y coordinates of the points"""
+        self._dirty = False
+
+    def set_points(self, points: np.ndarray):
+        """Replace points of the line, an array of shape (n, 2)."""
+        coords = np.round(points, 1).ravel().tolist()
+        if coords == self._coords:
+            return
+        self._coords = coords
+        self._dirty = True
+
+    def clear(self):
+        if len(self._coords) > 0:
+            self._coords = []
+            self._dirty = True
+
+    def destroy(self):
+        render_queue.delete(self.canvas, self.line_id)
+
+    def custom_render(self, alpha: float = 1.0):
+        if not self._dirty:
+            return
+        self._dirty = False
+        with profiler.section("canvas"):
+            if len(self._coords) < 4:
+                render_queue.itemconfigure(self.canvas, self.line_id, state="hidden")
+                return
+            render_queue.coords(self.canvas, self.line_id, *self._coords)
+            render_queue.itemconfigure(self.canvas, self.line_id, state="normal")
+
+
+class TerrainRenderer:
+    """
+    Draws terrain map as a single canvas image.
+    Changes of the terrain are uploaded to the photo only within the changed region.
+    """
+
+    def __init__(self, canvas: tk.Canvas, terrain: Terrain):
+        self.canvas = canvas
+        self.terrain = terrain
+        self.photo = utils.as_photo(terrain.map)
+        self.photo_id = canvas.create_image(0, 0, image=self.photo, anchor="nw", tags=Layer.TERRAIN.value)
+        render_layers.changed(canvas, Layer.TERRAIN.value)
+        terrain.changed.subscribe(self.__on_terrain_changed, weak=True)
+
+    def __on_terrain_changed(self, x0: int, y0: int, x1: int, y1: int):
+        with profiler.section("terrain_paste"):
+            utils.paste_photo(self.photo, self.terrain.map[y0:y1, x0:x1], x0, y0)
+
+    def custom_render(self, alpha: float = 1.0):
+        return
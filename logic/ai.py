@@ -0,0 +1,225 @@
+"""
+Trajectory-search AI of NPC players.
+
+Candidate shots (tank position and cannon angle) are predicted from cached trajectory tables of logic.ballistics,
+against a snapshot of the terrain height profile, and the shot landing closest to an enemy is chosen.
+Interactively a coarse search runs in process, the remaining candidates are split among a process pool
+one chunk per worker, and the best shot found within Config.ai_latency is taken. In deterministic mode
+(headless) all candidates are evaluated in process, so the same match always produces the same decisions.
+"""
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from config import Config
+from logic import ballistics
+
+
+class Difficulty(NamedTuple):
+    angles: int
+    """Number of cannon angles tried from each position"""
+    moves: int
+    """Number of positions tried on each side of the tank"""
+    aim_error: float
+    """Standard deviation in degrees of the error added to the chosen angle"""
+
+
+DIFFICULTIES = {
+    "Easy": Difficulty(angles=24, moves=0, aim_error=6.0),
+    "Medium": Difficulty(angles=90, moves=2, aim_error=2.0),
+    "Hard": Difficulty(angles=360, moves=5, aim_error=0.0),
+}
+"""Compute budget and precision of NPCs, by names offered in game setup"""
+
+
+class ShotProblem(NamedTuple):
+    """Everything needed to predict shots of a tank, picklable so that it can be sent to worker processes."""
+    heights: np.ndarray
+    """Y coordinate of the terrain surface in each column"""
+    height: int
+    """Height of the map in pixels"""
+    pivot: Tuple[float, float]
+    """Offset of the cannon pivot from the tank position"""
+    cannon_length: float
+    speed: float
+    """Launch speed in pixels per second"""
+    drag: float
+    radius: float
+    """Radius of the projectile"""
+    step: float
+    """Duration of a simulation step in seconds"""
+    max_steps: int
+    """Number of steps after which a shot counts as lost"""
+    own_x: float
+    """X coordinate of the shooting tank"""
+    targets: Tuple[float, ...]
+    """X coordinates of enemy tanks"""
+
+
+class Plan(NamedTuple):
+    x: float
+    """X coordinate to move the tank to before shooting"""
+    angle: float
+    """Cannon angle in degrees"""
+    landing: float
+    """Predicted X coordinate of impact"""
+    error: float
+    """Predicted distance of impact from the nearest enemy"""
+
+
+def landing_points(problem: ShotProblem, xs: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    Predict shots from tank positions xs at cannon angles, all at once, see ballistics.landings().
+    :return: X coordinates of impact on the terrain, NaN for shots leaving the map.
+    """
+    trajectories = ballistics.table(problem.speed, problem.drag, problem.cannon_length, problem.step,
+                                    problem.max_steps)
+    columns = np.clip(xs.astype(int), 0, len(problem.heights) - 1)
+    pivots = np.column_stack((xs + problem.pivot[0], problem.heights[columns] + problem.pivot[1]))
+    landing, _ = ballistics.landings(trajectories, pivots, angles, problem.heights, problem.height, problem.radius)
+    return landing
+
+
+def best_shot(problem: ShotProblem, xs: np.ndarray, angles: np.ndarray) -> Plan | None:
+    """Evaluate candidate shots and pick the one landing closest to an enemy, None if none of them lands."""
+    landing = landing_points(problem, xs, angles)
+    targets = np.asarray(problem.targets)[:, np.newaxis]
+    error = np.abs(landing[np.newaxis, :] - targets).min(axis=0)
+    # shots falling onto the shooter itself are worthless, moving is slightly discouraged
+    error[np.abs(landing - problem.own_x) < Config.crater_radius + Config.tank_w / 2] = np.nan
+    score = error + 0.01 * np.abs(xs - problem.own_x)
+    if np.all(np.isnan(score)):
+        return None
+    i = int(np.nanargmin(score))
+    return Plan(float(xs[i]), float(angles[i]), float(landing[i]), float(error[i]))
+
+
+def better(a: Plan | None, b: Plan | None, own_x: float) -> Plan | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    score_a = a.error + 0.01 * abs(a.x - own_x)
+    score_b = b.error + 0.01 * abs(b.x - own_x)
+    return b if score_b < score_a else a
+
+
+def candidates(problem: ShotProblem, difficulty: Difficulty, move_span: float,
+               chunks: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Candidate shots of a difficulty, split into chunks.
+    With more than one chunk, the first one is a small coarse search from the current position serving as a fallback,
+    the rest of candidates is interleaved among the remaining chunks.
+    :param move_span: Distance between two tried positions, should be a multiple of tank speed.
+    :param chunks: Number of chunks to split the candidates into.
+    """
+    low = Config.tank_w / 2
+    high = len(problem.heights) - 1 - Config.tank_w / 2
+    offsets = np.arange(-difficulty.moves, difficulty.moves + 1) * move_span
+    positions = problem.own_x + offsets[(problem.own_x + offsets >= low) & (problem.own_x + offsets <= high)]
+    angles = np.linspace(5, 175, difficulty.angles)
+    xs, angles = (grid.ravel() for grid in np.meshgrid(positions, angles))
+    if chunks == 1:
+        return [(xs, angles)]
+
+    coarse = np.zeros(len(xs), dtype=bool)
+    coarse[np.flatnonzero(xs == problem.own_x)[::max(1, difficulty.angles // Config.ai_coarse_angles)]] = True
+    xs_rest, angles_rest = xs[~coarse], angles[~coarse]
+    rest = chunks - 1
+    return [(xs[coarse], angles[coarse])] + \
+        [(xs_rest[i::rest], angles_rest[i::rest]) for i in range(min(rest, len(xs_rest)))]
+
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def pool() -> ProcessPoolExecutor:
+    """Process pool shared by all NPCs, started on first use."""
+    global _pool
+    if _pool is None:
+        # spawned rather than forked, a fork of the process running Tk may deadlock
+        _pool = ProcessPoolExecutor(Config.ai_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def deterministic() -> bool:
+    """Whether searches have to produce the same result regardless of machine speed."""
+    return Config.ai_deterministic or Config.headless
+
+
+def parallel() -> bool:
+    """Whether searches run in the process pool, on a single core it would only add overhead."""
+    return Config.ai_workers > 0 and (os.cpu_count() or 1) > 1
+
+
+class Search:
+    """Search of the best shot for a single turn, either running in the process pool or already finished."""
+
+    def __init__(self, problem: ShotProblem, difficulty: Difficulty, move_span: float):
+        self.problem = problem
+        self.result: Plan | None = None
+        self.done = False
+
+        if deterministic() or not parallel():
+            for xs, angles in candidates(problem, difficulty, move_span, 1):
+                self.result = best_shot(problem, xs, angles)
+            self.done = True
+            return
+
+        # the coarse chunk runs in process as the fallback, the pool gets one chunk per worker, so that no chunk
+        # waits in the queue and work outliving the deadline is at most what is already running
+        chunks = candidates(problem, difficulty, move_span, Config.ai_workers + 1)
+        self.deadline = time.perf_counter() + Config.ai_latency
+        self.futures: List[Future] = [pool().submit(best_shot, problem, xs, angles) for xs, angles in chunks[1:]]
+        self.result = best_shot(problem, *chunks[0])
+
+    def poll(self, now: float | None = None) -> bool:
+        """
+        Collect finished work, finishing the search once all work is done or the latency target passed.
+        :return: Whether the search is done, its result is then in `result`.
+        """
+        if self.done:
+            return True
+        now = time.perf_counter() if now is None else now
+        finished = [future for future in self.futures if future.done()]
+        if len(finished) < len(self.futures) and now < self.deadline:
+            return False
+
+        # chunks the pool did not finish in time (e.g. while still starting) leave the coarse result in place
+        for future in finished:
+            if future.exception() is None:
+                self.result = better(self.result, future.result(), self.problem.own_x)
+        self.cancel()
+        self.done = True
+        return True
+
+    def cancel(self):
+        if self.done:
+            return
+        for future in self.futures:
+            future.cancel()
+
+
+def aim_error(seed: int, turn: int, player: int, difficulty: Difficulty) -> float:
+    """Error added to the angle chosen by an NPC, seeded so that matches replay identically."""
+    if difficulty.aim_error == 0:
+        return 0
+    return float(np.random.default_rng([seed, turn, player]).normal(0, difficulty.aim_error))
+
+
+def max_steps() -> int:
+    return int(math.ceil(Config.ai_max_flight_time * Config.phys_step_rate))
@@ -0,0 +1,208 @@
+"""
+Ballistic solver predicting shots from cached trajectory tables.
+
+Quadratic drag has no closed form solution, so trajectories are stepped once with the projectile integrator
+for a grid of cannon angles and cached by launch parameters. Trajectories are stored relative to the cannon pivot,
+so a single table serves tanks at any position and queries only interpolate between the two nearest angles
+and test the points against the terrain height profile.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config import Config
+from game_components.projectile import integrate
+from logic.terrain import Terrain
+from toolkit.cache import LRUCache
+
+
+class TrajectoryTable:
+    """Positions of shots at every step of flight, relative to the cannon pivot, for a grid of cannon angles."""
+
+    def __init__(self, speed: float, drag: float, cannon_length: float, step: float, steps: int,
+                 resolution: float):
+        """
+        :param speed: Launch speed in pixels per second.
+        :param drag: Quadratic drag coefficient of the projectile.
+        :param cannon_length: Distance of the muzzle from the pivot, where shots start.
+        :param step: Duration of a simulation step in seconds.
+        :param steps: Number of steps of flight recorded.
+        :param resolution: Difference of two neighbouring angles in degrees.
+        """
+        self.step = step
+        self.resolution = resolution
+        self.angles = np.arange(0, 360, resolution)
+        """Cannon angles in degrees of table rows"""
+
+        radians = np.radians(self.angles)
+        direction = np.column_stack((np.cos(radians), -np.sin(radians)))
+        pos = direction * cannon_length
+        vel = direction * speed
+        drag = np.full(len(self.angles), drag)
+
+        self.points = np.empty((len(self.angles), steps, 2), dtype=np.float32)
+        """Positions of shape (angles, steps, 2), row i holds positions after steps 1 to `steps`"""
+        for k in range(steps):
+            integrate(pos, vel, drag, step)
+            self.points[:, k] = pos
+
+    @property
+    def steps(self) -> int:
+        return self.points.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.points.nbytes
+
+    def index(self, angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Rows neighbouring angles and weights of the second ones, angles wrap around.
+        :return: Tuple (rows, next rows, weights) of arrays shaped as angles.
+        """
+        position = np.mod(angles, 360) / self.resolution
+        rows = np.floor(position).astype(np.int64) % len(self.angles)
+        return rows, (rows + 1) % len(self.angles), position - np.floor(position)
+
+    def trajectory(self, angle: float) -> np.ndarray:
+        """Positions of shape (steps, 2) of a shot at angle, interpolated between neighbouring rows."""
+        row, next_row, weight = self.index(np.array([angle]))
+        return self.points[row[0]] * (1 - weight[0]) + self.points[next_row[0]] * weight[0]
+
+
+trajectory_cache: LRUCache[TrajectoryTable] = LRUCache(Config.trajectory_cache_budget, lambda table: table.nbytes)
+"""Cache of trajectory tables, keyed by arguments of table"""
+
+
+def table(speed: float, drag: float, cannon_length: float, step: float | None = None, steps: int | None = None,
+          resolution: float | None = None) -> TrajectoryTable:
+    """
+    Get a cached trajectory table, building it on the first request.
+    Building takes a few tens of milliseconds, every following request is a dictionary lookup.
+    :param step: Duration of a simulation step, one physics step by default.
+    :param steps: Number of steps of flight, Config.ai_max_flight_time by default.
+    :param resolution: Angle between rows in degrees, Config.ballistics_resolution by default.
+    """
+    step = 1.0 / Config.phys_step_rate if step is None else step
+    steps = int(math.ceil(Config.ai_max_flight_time / step)) if steps is None else steps
+    resolution = Config.ballistics_resolution if resolution is None else resolution
+    key = (speed, drag, cannon_length, step, steps, resolution)
+    result = trajectory_cache.get(key)
+    if result is None:
+        result = TrajectoryTable(speed, drag, cannon_length, step, steps, resolution)
+        trajectory_cache.put(key, result)
+    return result
+
+
+def landings(trajectories: TrajectoryTable, pivots: np.ndarray, angles: np.ndarray, heights: np.ndarray,
+             height: int, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find where shots hit the terrain, all at once.
+    Trajectories are tested in blocks of steps, shots that ended are dropped before the next block,
+    so the cost follows the flight time rather than the table length.
+    :param pivots: Cannon pivots of shape (n, 2).
+    :param angles: Cannon angles in degrees of shape (n,).
+    :param heights: Y coordinate of the terrain surface in each column.
+    :param height: Height of the map in pixels.
+    :param radius: Radius of the projectile.
+    :return: Tuple (x coordinates, steps) of impacts, NaN and -1 for shots leaving the map or still flying.
+    """
+    n = len(angles)
+    rows, next_rows, weights = trajectories.index(angles)
+    landing = np.full(n, np.nan)
+    landing_step = np.full(n, -1)
+    active = np.arange(n)
+    width = len(heights)
+    margin = Config.projectile_cull_margin
+
+    start = 0
+    while start < trajectories.steps and len(active) > 0:
+        stop = min(trajectories.steps, start + max(8, Config.ballistics_block_size // len(active)))
+        weight = weights[active, np.newaxis]
+        x = trajectories.points[rows[active], start:stop, 0] * (1 - weight) + \
+            trajectories.points[next_rows[active], start:stop, 0] * weight + pivots[active, 0, np.newaxis]
+        y = trajectories.points[rows[active], start:stop, 1] * (1 - weight) + \
+            trajectories.points[next_rows[active], start:stop, 1] * weight + pivots[active, 1, np.newaxis]
+
+        ground = heights[np.clip(x.astype(np.int64), 0, width - 1)]
+        hit = (x >= 0) & (x < width) & (y + radius >= ground)
+        ended = hit | (x < -margin) | (x > width + margin) | (y > height + margin)
+        first = ended.argmax(axis=1)
+        done = ended[np.arange(len(active)), first]
+        landed = np.flatnonzero(done & hit[np.arange(len(active)), first])
+        landing[active[landed]] = x[landed, first[landed]]
+        landing_step[active[landed]] = start + first[landed]
+
+        active = active[~done]
+        start = stop
+    return landing, landing_step
+
+
+class Solver:
+    """
+    Shot queries of a tank against the current terrain.
+    Landing points of all table angles are cached per pivot, so that a repeated search of the angle
+    hitting a target costs microseconds. The cache is dropped whenever the terrain changes.
+    """
+
+    max_sweeps = 16
+    """Number of pivots whose landing points are kept"""
+
+    def __init__(self, trajectories: TrajectoryTable, terrain: Terrain, radius: float):
+        self.trajectories = trajectories
+        self.terrain = terrain
+        self.radius = radius
+        self._sweeps: Dict[Tuple[float, float], np.ndarray] = {}
+        """Landing points of all table angles by pivot"""
+        terrain.changed.subscribe(self.__on_terrain_changed, weak=True)
+
+    def __on_terrain_changed(self, x0: int, y0: int, x1: int, y1: int):
+        self.invalidate()
+
+    def invalidate(self):
+        self._sweeps.clear()
+
+    def landing(self, pivot: Tuple[float, float], angle: float) -> float:
+        """X coordinate of impact of a shot at angle, NaN if it leaves the map."""
+        landing, _ = self.__landings(pivot, np.array([angle]))
+        return float(landing[0])
+
+    def path(self, pivot: Tuple[float, float], angle: float) -> np.ndarray:
+        """Positions of shape (n, 2) of a shot at angle until it hits the terrain or leaves the map."""
+        _, landing_step = self.__landings(pivot, np.array([angle]))
+        end = self.trajectories.steps if landing_step[0] < 0 else landing_step[0] + 1
+        return self.trajectories.trajectory(angle)[:end] + pivot
+
+    def sweep(self, pivot: Tuple[float, float]) -> np.ndarray:
+        """Landing points of shots at all angles of the table, NaN for shots leaving the map."""
+        pivot = (float(pivot[0]), float(pivot[1]))
+        result = self._sweeps.get(pivot)
+        if result is None:
+            if len(self._sweeps) >= self.max_sweeps:
+                self._sweeps.clear()
+            result, _ = self.__landings(pivot, self.trajectories.angles)
+            self._sweeps[pivot] = result
+        return result
+
+    def angles_to_hit(self, pivot: Tuple[float, float], target_x: float) -> List[float]:
+        """
+        Cannon angles in degrees landing shots exactly at target_x, interpolated between table angles.
+        Usually there is a flat and a steep solution to each side, none if the target is out of range.
+        """
+        sweep = self.sweep(pivot)
+        error = sweep - target_x
+        crossing = np.flatnonzero(np.sign(error) != np.sign(np.roll(error, -1)))
+        crossing = crossing[~np.isnan(error[crossing]) & ~np.isnan(np.roll(error, -1)[crossing])]
+
+        angles = []
+        for i in crossing:
+            a, b = error[i], error[(i + 1) % len(error)]
+            t = 0 if a == b else a / (a - b)
+            angles.append(float(self.trajectories.angles[i] + t * self.trajectories.resolution))
+        return angles
+
+    def __landings(self, pivot: Tuple[float, float], angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        pivots = np.broadcast_to(np.asarray(pivot, dtype=float), (len(angles), 2))
+        return landings(self.trajectories, pivots, angles, self.terrain.heights, self.terrain.height, self.radius)
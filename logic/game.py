@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import random
+import tkinter as tk
+from typing import List
+
+from config import CollisionLayer, Config
+from game_components.collider import PixelCollider, create_broadphase
+from game_components.projectile import ProjectileSystem
+from game_components.renderer import TerrainRenderer
+from logic import terrain
+from logic.player import Human, NPC, Player
+from logic.tank import Tank
+from toolkit.vector import Vector2
+
+
+class Game:
+    """
+    State of a single match and its update pipeline, independent of the widget hosting it.
+    Everything is drawn onto the provided canvas, which may be a tk.Canvas
+    or a toolkit.canvas.HeadlessCanvas when running without a display.
+    """
+
+    players: List[Player]
+    tanks: List[Tank]
+
+    def __init__(self, canvas: tk.Canvas, player_count=2, seed: int | None = None,
+                 npc_count: int = 0, difficulty: str = "Easy"):
+        self.canvas = canvas
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        """Seed of all randomness in the match, same seed produces the same match"""
+
+        self.colliders = create_broadphase()
+        """Broadphase of all colliders in the match"""
+
+        self.terrain = terrain.Terrain(terrain.generate(Config.screen_w, Config.screen_h, seed=self.seed))
+        self.terrain_renderer = TerrainRenderer(self.canvas, self.terrain)
+        self.map_collider = PixelCollider(self, self.terrain.mask, collision_layer=CollisionLayer.TERRAIN)
+        self.terrain.changed.subscribe(self.__on_terrain_changed, weak=True)
+        self.projectiles = ProjectileSystem(self)
+
+        player_dist = Config.screen_w // (player_count + 1)
+        self.tanks = [Tank(self) for _ in range(player_count)]
+        # humans first, the last npc_count players are controlled by AI
+        self.players = [Human(self, tank) if i < player_count - npc_count else NPC(self, tank, difficulty)
+                        for i, tank in enumerate(self.tanks)]
+        for i in range(player_count):
+            x = player_dist * (i + 1)
+            y = self.terrain.height_at(x)
+            self.tanks[i].pos = Vector2(x, y)
+        self.active_player = 0
+        self.turn = 0
+        """Number of turns finished so far"""
+        self.turn_started = False
+        self.turn_shot = False
+        """Flag whether the active player already fired during this turn"""
+        self.tick = 0
+        """Number of simulation steps done so far"""
+        self.difficulty = difficulty
+        """Difficulty of NPCs, key of logic.ai.DIFFICULTIES"""
+
+    def destroy(self):
+        """Release the match, disconnecting its players from input and removing their drawings."""
+        for player in self.players:
+            player.destroy()
+
+    def __on_terrain_changed(self, x0: int, y0: int, x1: int, y1: int):
+        self.map_collider.update_region(x0, y0, x1, y1)
+
+    def custom_update(self, delta: float):
+        self.map_collider.custom_update(delta)
+
+        for player in self.players:
+            player.custom_update(delta)
+
+        self.projectiles.custom_update(delta)
+
+        if not self.turn_started:
+            self.turn_started = True
+            self.players[self.active_player].start_turn()
+        elif self.turn_shot and len(self.projectiles) == 0:
+            self.next_turn()
+        self.tick += 1
+
+    def next_turn(self):
+        """End turn of the active player once its shot landed and start turn of the next one."""
+        self.players[self.active_player].end_turn()
+        self.active_player = (self.active_player + 1) % len(self.players)
+        self.turn += 1
+        self.turn_shot = False
+        self.players[self.active_player].start_turn()
+
+    def custom_render(self, alpha: float):
+        self.terrain_renderer.custom_render(alpha)
+        self.map_collider.custom_render(alpha)
+
+        for player in self.players:
+            player.custom_render(alpha)
+
+        self.projectiles.custom_render(alpha)
@@ -1,18 +1,37 @@
 import tkinter as tk
-from typing import Dict
+from typing import Dict, Iterable, List, Set
 
 from config import InputKey, Config
 from toolkit.event import Event
 
 
 class _Input:
+    """
+    Keyboard input, translated from Tk key events into InputKeys.
+
+    Tk events only record key state, handlers in key_down are called from custom_update() during the fixed
+    simulation step. A newly pressed key fires once, a held key of Config.input_repeat_keys fires again
+    every Config.input_repeat_interval seconds, so movement speed does not depend on the keyboard repeat rate
+    and a flood of repeat events costs only a dictionary lookup each.
+    """
     key_down: Dict[InputKey, Event]
 
+    held: Dict[InputKey, float]
+    """Keys currently held down, with time in seconds until their next repeat"""
+
     debug: bool = False
 
     def __init__(self):
         self.app = None
         self.key_down = {}
+        self.held = {}
+        self._keysyms: Dict[str, InputKey] = {}
+        """Lookup of InputKey by Tk keysym, built from Config.control_keysyms"""
+        self._pressed: List[InputKey] = []
+        """Keys pressed since last custom_update, in order of pressing"""
+        self._released: Set[InputKey] = set()
+        """Keys released since last custom_update"""
+
         for key in list(InputKey):
             self.key_down[key] = Event()
             if self.debug:
@@ -23,17 +42,65 @@ class _Input:
             print("Debug mode turned", "ON" if Config.debug_mode else "OFF")
 
         self.key_down[InputKey.DEBUG].append(toggle_debug)
+        self.rebuild_bindings()
 
     def bind(self, app: tk.Misc):
         self.app = app
         app.bind('<KeyPress>', self.on_key_press)
-        pass
+        app.bind('<KeyRelease>', self.on_key_release)
+        app.bind('<FocusOut>', lambda _: self.release_all())
+
+    def rebuild_bindings(self):
+        """Rebuild keysym lookup from Config.control_keysyms, has to be called after the bindings change."""
+        self._keysyms = {keysym: key for key, keysyms in Config.control_keysyms.items() for keysym in keysyms}
+
+    def rebind(self, key: InputKey, keysyms: Iterable[str]):
+        """Replace keysyms triggering key."""
+        Config.control_keysyms[key] = list(keysyms)
+        self.rebuild_bindings()
 
     def on_key_press(self, event: tk.Event):
-        for key in list(InputKey):
-            if event.keysym in Config.control_keysyms[key]:
+        key = self._keysyms.get(event.keysym)
+        if key is None:
+            return
+        if key in self._released:
+            # auto-repeat sends release immediately followed by press, the key is still held
+            self._released.discard(key)
+            return
+        if key in self.held or key in self._pressed:
+            return
+        self._pressed.append(key)
+
+    def on_key_release(self, event: tk.Event):
+        key = self._keysyms.get(event.keysym)
+        if key is not None and (key in self.held or key in self._pressed):
+            self._released.add(key)
+
+    def release_all(self):
+        """Forget all held keys, e.g. when the window loses focus and releases would not be received."""
+        self._released.update(self.held)
+        self._released.update(self._pressed)
+
+    def custom_update(self, delta: float):
+        """Fire handlers of keys pressed since the last step and of held keys due to repeat."""
+        for key, remaining in self.held.items():
+            if key not in Config.input_repeat_keys:
+                continue
+            remaining -= delta
+            if remaining <= 0:
+                remaining += Config.input_repeat_interval
                 self.key_down[key]()
-                return
+            self.held[key] = remaining
+
+        pressed = self._pressed
+        self._pressed = []
+        for key in pressed:
+            self.held[key] = Config.input_repeat_interval
+            self.key_down[key]()
+
+        for key in self._released:
+            self.held.pop(key, None)
+        self._released.clear()
 
 
 Input = _Input()
@@ -1,53 +1,213 @@
 from __future__ import annotations
 
-import tkinter as tk
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
-from config import InputKey
+import numpy as np
+
+import utils
+from config import Config, InputKey
+from game_components.renderer import PathRenderer
+from logic import ai
 from logic.input import Input
 from logic.tank import Tank
+from toolkit.event import Event, Subscription
 
 if TYPE_CHECKING:
-    from frames.game_play import GamePlay
+    from logic.game import Game
 
 
 class Player:
-    def __init__(self, game: GamePlay, tank: Tank):
+    # region health: int { get; set }
+    _health: int = 100
+
+    @property
+    def health(self) -> int:
+        return self._health
+
+    @health.setter
+    def health(self, value: int):
+        if self._health == value:
+            return
+        self._health = value
+        self.health_changed(value)
+
+    # endregion
+
+    def __init__(self, game: Game, tank: Tank):
         self.game = game
         self.tank = tank
-        self.health = tk.IntVar(game, value=100)
+        self.health_changed = Event()
+        """Raised with new value whenever health changes"""
 
     def custom_update(self, delta: float):
         self.tank.custom_update(delta)
 
+    def custom_render(self, alpha: float):
+        self.tank.custom_render(alpha)
+
     def start_turn(self):
         pass
 
+    def end_turn(self):
+        pass
+
+    def destroy(self):
+        """Release the player once its match ends."""
+        self.end_turn()
+
+    def fire(self):
+        """Fire the tank, only a single shot is allowed per turn."""
+        if self.game.turn_shot:
+            return
+        self.game.turn_shot = True
+        self.tank.fire()
+
 
 class Human(Player):
 
-    connected: bool = False
+    subscriptions: List[Subscription] = []
+    """Subscriptions of tank controls to input, only non-empty during turn of the player"""
+
+    def __init__(self, game: Game, tank: Tank):
+        super().__init__(game, tank)
+        self.preview = PathRenderer(game.canvas, Config.trajectory_preview_color) if Config.trajectory_preview \
+            else None
+        """Predicted path of the shot, drawn during turn of the player"""
+
+    @property
+    def connected(self) -> bool:
+        return len(self.subscriptions) > 0
 
     def start_turn(self):
         if not self.connected:
-            print("Player input connected")
-            Input.key_down[InputKey.DOWN].append(self.tank.aim_minus)
-            Input.key_down[InputKey.UP].append(self.tank.aim_plus)
-            Input.key_down[InputKey.LEFT].append(self.tank.move_left)
-            Input.key_down[InputKey.RIGHT].append(self.tank.move_right)
-            Input.key_down[InputKey.SELECT].append(self.tank.fire)
-            self.connected = True
+            # weakly, so that input does not keep the tank of a finished game alive
+            self.subscriptions = [
+                Input.key_down[InputKey.DOWN].subscribe(self.tank.aim_minus, weak=True),
+                Input.key_down[InputKey.UP].subscribe(self.tank.aim_plus, weak=True),
+                Input.key_down[InputKey.LEFT].subscribe(self.tank.move_left, weak=True),
+                Input.key_down[InputKey.RIGHT].subscribe(self.tank.move_right, weak=True),
+                Input.key_down[InputKey.SELECT].subscribe(self.fire, weak=True),
+            ]
 
     def end_turn(self):
         if self.connected:
-            print("Player input disconnected")
-            Input.key_down[InputKey.DOWN].remove(self.tank.aim_minus)
-            Input.key_down[InputKey.UP].remove(self.tank.aim_plus)
-            Input.key_down[InputKey.LEFT].remove(self.tank.move_left)
-            Input.key_down[InputKey.RIGHT].remove(self.tank.move_right)
-            Input.key_down[InputKey.SELECT].remove(self.tank.fire)
-            self.connected = False
+            for subscription in self.subscriptions:
+                subscription.cancel()
+            self.subscriptions = []
+
+    def destroy(self):
+        super().destroy()
+        if self.preview is not None:
+            self.preview.destroy()
+
+    def custom_render(self, alpha: float):
+        super().custom_render(alpha)
+        if self.preview is None:
+            return
+        if self.connected and not self.game.turn_shot:
+            path = self.tank.solver.path(self.tank.pivot(), self.tank.cannon_angle)
+            self.preview.set_points(path[np.r_[0:len(path):Config.trajectory_preview_stride, len(path) - 1]])
+        else:
+            self.preview.clear()
+        self.preview.custom_render(alpha)
 
 
 class NPC(Player):
-    pass
+    """Player controlled by trajectory-search AI, see logic.ai."""
+
+    move_span: int = 10 * Tank.tank_speed
+    """Distance between two positions tried by the search"""
+
+    def __init__(self, game: Game, tank: Tank, difficulty: str = "Easy"):
+        super().__init__(game, tank)
+        self.difficulty = ai.DIFFICULTIES[difficulty]
+        self.search: ai.Search | None = None
+        """Search of the current turn, None outside of turn"""
+        self.plan: ai.Plan | None = None
+        """Shot chosen in the current turn, None while searching"""
+        self.action_time = 0.0
+        self.scripted = False
+        """Flag whether plans are provided via follow() rather than searched, e.g. during replay playback"""
+        self.planned = Event()
+        """Raised with the plan once the shot of the turn is chosen"""
+
+    def start_turn(self):
+        if self.search is None and not self.scripted:
+            self.search = ai.Search(self.__problem(), self.difficulty, self.move_span)
+        self.action_time = 0.0
+
+    def follow(self, plan: ai.Plan):
+        """Carry out a plan chosen elsewhere instead of searching, starting with the next update."""
+        self.plan = plan
+
+    def end_turn(self):
+        if self.search is not None:
+            self.search.cancel()
+        self.search = None
+        self.plan = None
+
+    def custom_update(self, delta: float):
+        super().custom_update(delta)
+        if self.game.turn_shot:
+            return
+        if self.plan is None:
+            if self.search is not None and self.search.poll():
+                self.plan = self.__decide(self.search.result)
+                self.planned(self.plan)
+            return
+
+        # act at the pace of a human holding keys
+        self.action_time += delta
+        if self.action_time < Config.input_repeat_interval:
+            return
+        self.action_time -= Config.input_repeat_interval
+
+        dx = self.plan.x - self.tank.pos.x
+        angle = self.plan.angle - self.tank.cannon_angle
+        if abs(dx) >= self.tank.tank_speed:
+            if dx > 0:
+                self.tank.move_right()
+            else:
+                self.tank.move_left()
+        elif abs(angle) > self.tank.cannon_speed:
+            if angle > 0:
+                self.tank.aim_plus()
+            else:
+                self.tank.aim_minus()
+        else:
+            self.tank.cannon_angle = self.plan.angle
+            self.fire()
+
+    def __problem(self) -> ai.ShotProblem:
+        pivot = self.tank.tank_cannon.position - self.tank.pos
+        ball_w, ball_h = utils.load_image(Config.res_path_ball, width=Config.ball_w).size
+        return ai.ShotProblem(heights=self.game.terrain.heights.copy(),
+                              height=self.game.terrain.height,
+                              pivot=(pivot.x, pivot.y),
+                              cannon_length=self.tank.tank_cannon.size.x,
+                              speed=self.tank.projectile_speed,
+                              drag=Config.cannonball_k * ball_w * ball_h,
+                              radius=Config.ball_w / 2,
+                              step=1.0 / Config.phys_step_rate,
+                              max_steps=ai.max_steps(),
+                              own_x=self.tank.pos.x,
+                              targets=tuple(player.tank.pos.x for player in self.game.players if player is not self))
+
+    def __decide(self, plan: ai.Plan | None) -> ai.Plan:
+        problem = self.search.problem
+        targets = np.array(problem.targets)
+        if plan is None:
+            # no shot lands, lob one towards the nearest enemy from where the tank stands
+            nearest = targets[np.argmin(np.abs(targets - self.tank.pos.x))]
+            plan = ai.Plan(self.tank.pos.x, 45 if nearest > self.tank.pos.x else 135, float("nan"), float("inf"))
+        else:
+            # search only tried discrete angles, solve for the one hitting the enemy exactly
+            pivot = (plan.x + problem.pivot[0], self.game.terrain.height_at(int(plan.x)) + problem.pivot[1])
+            target = targets[np.argmin(np.abs(targets - plan.landing))]
+            angles = self.tank.solver.angles_to_hit(pivot, target)
+            if len(angles) > 0:
+                angle = min(angles, key=lambda a: abs(a - plan.angle))
+                if abs(angle - plan.angle) < Config.ballistics_resolution + 180 / self.difficulty.angles:
+                    plan = plan._replace(angle=angle, landing=float(target), error=0.0)
+        error = ai.aim_error(self.game.seed, self.game.turn, self.game.players.index(self), self.difficulty)
+        return plan._replace(angle=plan.angle + error)
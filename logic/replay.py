@@ -0,0 +1,292 @@
+"""
+Recording and playback of matches.
+
+A match is fully determined by its setup (seed, players, NPC difficulty), by the InputKeys fired in each
+simulation step and by the shots NPCs chose, so a replay stores only those, streamed into a compact binary file
+while playing. NPC searches may depend on machine speed, so playback follows the recorded shots instead of searching.
+Playback runs the regular update pipeline headlessly without rendering, i.e. as fast as the simulation allows.
+Checksums of the match state are stored periodically, so that playback detects the first step it diverges from
+the recorded match.
+
+Usage: python -m logic.replay ./replay.tkr --spikes 10
+
+File layout, integers little endian:
+    header  "TKZR", version u8, seed u32, players u8, NPCs u8, difficulty u8, step rate u16
+    records varint ticks since previous record, u8 kind, kind specific payload
+            kind < KIND_PLAN: index of the InputKey fired, no payload
+            KIND_PLAN: u8 index of the NPC player, f64 x coordinate and f64 cannon angle of the chosen shot
+            KIND_CHECKSUM: u32 checksum of the state after the tick
+            KIND_END: no payload, last record
+"""
+from __future__ import annotations
+
+import argparse
+import struct
+import time
+import zlib
+from typing import BinaryIO, List, NamedTuple, Tuple
+
+import numpy as np
+
+from config import Config, InputKey
+from logic import simulation
+from logic.ai import DIFFICULTIES, Plan
+from logic.game import Game
+from logic.input import Input
+from logic.player import NPC
+
+MAGIC = b"TKZR"
+VERSION = 2
+HEADER = struct.Struct("<4sBIBBBH")
+PLAN = struct.Struct("<Bdd")
+
+KIND_PLAN = 0xFD
+KIND_CHECKSUM = 0xFE
+KIND_END = 0xFF
+
+PAYLOAD_SIZES = {KIND_PLAN: PLAN.size, KIND_CHECKSUM: 4}
+"""Bytes following the kind of records with a payload"""
+
+KEYS = list(InputKey)
+"""InputKeys by their index stored in replays"""
+
+DIFFICULTY_NAMES = list(DIFFICULTIES)
+"""Difficulty names by their index stored in replays"""
+
+
+class ReplayError(Exception):
+    """Replay file is malformed or was recorded with incompatible settings."""
+
+
+class Header(NamedTuple):
+    seed: int
+    players: int
+    npcs: int
+    difficulty: str
+    step_rate: int
+    """Simulation steps per second the match was recorded with"""
+
+
+class Replay(NamedTuple):
+    header: Header
+    events: List[Tuple[int, InputKey]]
+    """InputKeys by tick they were fired in, in order of firing"""
+    plans: List[Tuple[int, int, Plan]]
+    """Shots chosen by NPCs as (tick, player index, plan), in order of choosing"""
+    checksums: List[Tuple[int, int]]
+    """Checksums of the match state by tick they were taken after"""
+    ticks: int
+    """Number of simulation steps of the match"""
+
+
+def write_varint(file: BinaryIO, value: int):
+    """Write a non-negative integer in 7 bits per byte, the high bit flagging following bytes."""
+    while value >= 0x80:
+        file.write(bytes((value & 0x7F | 0x80,)))
+        value >>= 7
+    file.write(bytes((value,)))
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Read an integer written by write_varint, returning it with offset of the following byte."""
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError("Replay ends inside of a record")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def checksum(game: Game) -> int:
+    """CRC32 of the state deciding the future of the match, i.e. tanks, projectiles and terrain surface."""
+    crc = zlib.crc32(np.array([(tank.pos.x, tank.pos.y, tank.cannon_angle) for tank in game.tanks]).tobytes())
+    crc = zlib.crc32(game.projectiles.pos[:len(game.projectiles)].tobytes(), crc)
+    crc = zlib.crc32(game.projectiles.vel[:len(game.projectiles)].tobytes(), crc)
+    crc = zlib.crc32(game.terrain.heights.tobytes(), crc)
+    return zlib.crc32(struct.pack("<II", game.active_player, game.turn), crc)
+
+
+class Recorder:
+    """
+    Streams a match into a replay file, InputKeys are recorded as they are fired by Input
+    and shots of NPCs as they are chosen, so that NPCs keep searching within their time limit while recording.
+    """
+
+    def __init__(self, path: str, game: Game):
+        self.game = game
+        self.file = open(path, "wb")
+        self.last_tick = 0
+        """Tick of the last written record"""
+
+        npcs = [player for player in game.players if isinstance(player, NPC)]
+        difficulty = game.difficulty if game.difficulty in DIFFICULTIES else DIFFICULTY_NAMES[0]
+        self.file.write(HEADER.pack(MAGIC, VERSION, game.seed, len(game.players), len(npcs),
+                                    DIFFICULTY_NAMES.index(difficulty), Config.phys_step_rate))
+        self.subscriptions = [Input.key_down[key].subscribe(lambda k=key: self.__on_key(k)) for key in KEYS]
+        self.subscriptions += [npc.planned.subscribe(lambda plan, i=game.players.index(npc): self.__on_plan(i, plan))
+                               for npc in npcs]
+
+    @property
+    def recording(self) -> bool:
+        return self.file is not None
+
+    def __record(self, kind: int, payload: bytes = b""):
+        write_varint(self.file, self.game.tick - self.last_tick)
+        self.file.write(bytes((kind,)))
+        self.file.write(payload)
+        self.last_tick = self.game.tick
+
+    def __on_key(self, key: InputKey):
+        if self.recording:
+            self.__record(KEYS.index(key))
+
+    def __on_plan(self, player: int, plan: Plan):
+        if self.recording:
+            self.__record(KIND_PLAN, PLAN.pack(player, plan.x, plan.angle))
+
+    def custom_update(self, delta: float):
+        """Record a checksum after every Config.replay_checksum_interval ticks, call after the match update."""
+        if self.recording and self.game.tick % Config.replay_checksum_interval == 0:
+            self.__record(KIND_CHECKSUM, struct.pack("<I", checksum(self.game)))
+            # so that a crash loses at most a checksum interval
+            self.file.flush()
+
+    def close(self):
+        """Finish the replay, does nothing if already finished."""
+        if not self.recording:
+            return
+        for subscription in self.subscriptions:
+            subscription.cancel()
+        self.__record(KIND_END)
+        self.file.close()
+        self.file = None
+
+
+def load(path: str) -> Replay:
+    """
+    Read a whole replay file, raise ReplayError if it is malformed.
+    Replay cut short, e.g. by a crash of the game, is read up to its last complete record.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ReplayError("Replay is shorter than its header")
+    magic, version, seed, players, npcs, difficulty, step_rate = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ReplayError(f"Not a replay of version {VERSION}")
+    header = Header(seed, players, npcs, DIFFICULTY_NAMES[difficulty], step_rate)
+
+    events = []
+    plans = []
+    checksums = []
+    tick = 0
+    offset = HEADER.size
+    while offset < len(data):
+        try:
+            delta, offset = read_varint(data, offset)
+        except ReplayError:
+            break
+        if offset >= len(data) or offset + 1 + PAYLOAD_SIZES.get(data[offset], 0) > len(data):
+            break
+        kind = data[offset]
+        offset += 1
+        tick += delta
+        if kind == KIND_END:
+            break
+        if kind == KIND_CHECKSUM:
+            checksums.append((tick, struct.unpack_from("<I", data, offset)[0]))
+            offset += 4
+        elif kind == KIND_PLAN:
+            player, x, angle = PLAN.unpack_from(data, offset)
+            plans.append((tick, player, Plan(x, angle, float("nan"), float("nan"))))
+            offset += PLAN.size
+        elif kind < len(KEYS):
+            events.append((tick, KEYS[kind]))
+        else:
+            raise ReplayError(f"Unknown record kind {kind}")
+    return Replay(header, events, plans, checksums, tick)
+
+
+class Playback(NamedTuple):
+    game: Game
+    ticks: int
+    elapsed: float
+    """Seconds the playback took"""
+    tick_times: np.ndarray
+    """Seconds each tick took, to find spikes"""
+    desync: int | None
+    """First tick whose checksum does not match the recorded one, None if the match replayed identically"""
+
+
+def play(replay: Replay, render_every: int = 0) -> Playback:
+    """
+    Replay a match headlessly, as fast as possible.
+    InputKeys are fired through Input.key_down, so handlers subscribed to them react as during recording.
+    NPCs do not search, they follow the recorded shots from the step after the one they were chosen in.
+    :param render_every: Render the match after every n-th step, or never if 0.
+    """
+    header = replay.header
+    if header.step_rate != Config.phys_step_rate:
+        raise ReplayError(f"Replay was recorded at {header.step_rate} steps per second, "
+                          f"not {Config.phys_step_rate}")
+    game = simulation.create_game(header.players, header.seed, npc_count=header.npcs, difficulty=header.difficulty)
+    step = 1.0 / Config.phys_step_rate
+    for player in game.players:
+        if isinstance(player, NPC):
+            player.scripted = True
+    checksums = dict(replay.checksums)
+    tick_times = np.zeros(replay.ticks)
+    desync = None
+
+    event = 0
+    plan = 0
+    start = time.perf_counter()
+    for tick in range(replay.ticks):
+        tick_start = time.perf_counter()
+        while event < len(replay.events) and replay.events[event][0] == tick:
+            Input.key_down[replay.events[event][1]]()
+            event += 1
+        game.custom_update(step)
+        while plan < len(replay.plans) and replay.plans[plan][0] == tick:
+            game.players[replay.plans[plan][1]].follow(replay.plans[plan][2])
+            plan += 1
+        if render_every > 0 and tick % render_every == 0:
+            game.custom_render(1.0)
+        tick_times[tick] = time.perf_counter() - tick_start
+
+        expected = checksums.get(game.tick)
+        if desync is None and expected is not None and expected != checksum(game):
+            desync = game.tick
+    return Playback(game, replay.ticks, time.perf_counter() - start, tick_times, desync)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a replay back headlessly and report its timing.")
+    parser.add_argument("path")
+    parser.add_argument("--render-every", type=int, default=0)
+    parser.add_argument("--spikes", type=int, default=5, help="number of slowest ticks listed")
+    args = parser.parse_args()
+
+    replay = load(args.path)
+    result = play(replay, args.render_every)
+    header = replay.header
+    print(f"seed {header.seed}, {header.players} players ({header.npcs} {header.difficulty} NPCs), "
+          f"{len(replay.events)} inputs, {result.ticks} ticks")
+    print(f"played in {result.elapsed:.2f} s, "
+          f"{result.ticks / Config.phys_step_rate / max(result.elapsed, 1e-9):.0f}x real time")
+    for tick in np.argsort(result.tick_times)[::-1][:args.spikes]:
+        print(f"tick {tick:6d}  {result.tick_times[tick] * 1000:7.2f} ms")
+    if result.desync is None:
+        print(f"no desync in {len(replay.checksums)} checksums")
+    else:
+        print(f"desync after tick {result.desync}")
+    result.game.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Headless simulation of matches, running the regular update pipeline without a Tk display.
+Useful for AI tuning, balance testing and benchmarking on a server.
+
+Usage: python -m logic.simulation --matches 100 --ticks 1200 --players 2 --seed 0 --npcs 2 --difficulty Hard
+"""
+import argparse
+import time
+from typing import Any, Dict
+
+from config import Config
+from logic.ai import DIFFICULTIES
+from logic.game import Game
+from toolkit.canvas import HeadlessCanvas
+
+
+def create_game(player_count: int = 2, seed: int | None = None, record: bool = False,
+                npc_count: int = 0, difficulty: str = "Easy") -> Game:
+    """
+    Create a match drawn onto a HeadlessCanvas.
+    Switches the whole process into headless mode, photos are no longer created from then on.
+    :param player_count: Number of players in the match.
+    :param seed: Seed of the match, random if not provided.
+    :param record: Whether the canvas records every call, see HeadlessCanvas.
+    :param npc_count: Number of players controlled by the AI.
+    :param difficulty: Difficulty of the NPCs, key of logic.ai.DIFFICULTIES.
+    """
+    Config.headless = True
+    canvas = HeadlessCanvas(Config.screen_w, Config.screen_h, record=record)
+    return Game(canvas, player_count, seed, npc_count, difficulty)
+
+
+def simulate(game: Game, ticks: int, render_every: int = 0):
+    """
+    Advance a match by a number of fixed simulation steps, as fast as possible.
+    :param game: Match to advance.
+    :param ticks: Number of simulation steps to run.
+    :param render_every: Render the match after every n-th step, or never if 0.
+    """
+    step = 1.0 / Config.phys_step_rate
+    for tick in range(ticks):
+        game.custom_update(step)
+        if render_every > 0 and tick % render_every == 0:
+            game.custom_render(1.0)
+
+
+def run_match(seed: int, player_count: int = 2, ticks: int = 1200, render_every: int = 0,
+              npc_count: int = 0, difficulty: str = "Easy") -> Dict[str, Any]:
+    """Create, simulate and release a single match, returning a summary of it."""
+    game = create_game(player_count, seed, npc_count=npc_count, difficulty=difficulty)
+    start = time.perf_counter()
+    simulate(game, ticks, render_every)
+    elapsed = time.perf_counter() - start
+    summary = {
+        "seed": seed,
+        "ticks": ticks,
+        "elapsed": elapsed,
+        "projectiles": len(game.projectiles),
+        "health": [player.health for player in game.players],
+    }
+    game.destroy()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless matches.")
+    parser.add_argument("--matches", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=1200)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match, following matches increment it")
+    parser.add_argument("--render-every", type=int, default=0)
+    parser.add_argument("--npcs", type=int, default=0, help="number of players controlled by the AI")
+    parser.add_argument("--difficulty", default="Easy", choices=list(DIFFICULTIES))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for i in range(args.matches):
+        run_match(args.seed + i, args.players, args.ticks, args.render_every, args.npcs, args.difficulty)
+    elapsed = time.perf_counter() - start
+    print(f"{args.matches} matches in {elapsed:.2f} s, {args.matches * 60 / elapsed:.0f} matches per minute")
+
+
+if __name__ == "__main__":
+    main()
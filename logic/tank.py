@@ -1,16 +1,17 @@
 from __future__ import annotations
 
-from typing import List, TYPE_CHECKING
+from typing import TYPE_CHECKING, Tuple
 
-from config import Config
+import utils
+from config import CollisionLayer, Config, Layer
 from game_components.collider import RectCollider
 from game_components.projectile import Projectile
 from game_components.renderer import SpriteRenderer
-from logic import terrain
+from logic import ballistics
 from toolkit.vector import Vector2, PartialVector2
 
 if TYPE_CHECKING:
-    from frames.game_play import GamePlay
+    from logic.game import Game
 
 
 class Tank:
@@ -56,13 +57,26 @@ class Tank:
 
     # endregion
 
+    # region solver: ballistics.Solver { get }
+    _solver: ballistics.Solver | None = None
+
+    @property
+    def solver(self) -> ballistics.Solver:
+        """Ballistic solver predicting shots of this tank, created on first use."""
+        if self._solver is None:
+            ball_w, ball_h = utils.load_image(Config.res_path_ball, width=Config.ball_w).size
+            trajectories = ballistics.table(self.projectile_speed, Config.cannonball_k * ball_w * ball_h,
+                                            self.tank_cannon.size.x)
+            self._solver = ballistics.Solver(trajectories, self.game.terrain, Config.ball_w / 2)
+        return self._solver
+
+    # endregion
+
     tank_base: SpriteRenderer
     tank_cannon: SpriteRenderer
     tank_collider: RectCollider
-    projectiles: List[Projectile]
 
-    def __init__(self, game: GamePlay, x=100, y=100):
-        self.projectiles = []
+    def __init__(self, game: Game, x=100, y=100):
         self.game = game
         self.canvas = game.canvas
         self._pos = Vector2(x, y)
@@ -71,23 +85,28 @@ class Tank:
                                         Config.res_path_tank_base,
                                         position=self._pos,
                                         size=PartialVector2(Config.tank_w, None),
-                                        anchor=Vector2(0.5, 1))
+                                        anchor=Vector2(0.5, 1),
+                                        layer=Layer.TANKS)
 
         cannon_origin = self.tank_base.abs_pos(Vector2(0.4, 0.1))
         self.tank_cannon = SpriteRenderer(self.canvas,
                                           Config.res_path_tank_cannon,
                                           position=cannon_origin,
                                           size=PartialVector2(Config.cannon_w, None),
-                                          anchor=Vector2(0, 0.5))
+                                          anchor=Vector2(0, 0.5),
+                                          rotation_step=self.cannon_speed,
+                                          layer=Layer.TANKS)
 
-        self.tank_collider = RectCollider(game, self.tank_base.abs_pos(), self.tank_base.size)
+        self.tank_collider = RectCollider(game, self.tank_base.abs_pos(), self.tank_base.size,
+                                          collision_layer=CollisionLayer.TANKS)
 
     def custom_update(self, delta: float):
-        self.tank_base.custom_update(delta)
-        self.tank_cannon.custom_update(delta)
         self.tank_collider.custom_update(delta)
-        for proj in self.projectiles:
-            proj.custom_update(delta)
+
+    def custom_render(self, alpha: float):
+        self.tank_base.custom_render(alpha)
+        self.tank_cannon.custom_render(alpha)
+        self.tank_collider.custom_render(alpha)
 
     def aim_plus(self):
         self.cannon_angle += self.cannon_speed
@@ -97,15 +116,20 @@ class Tank:
 
     def move_right(self):
         nx = self.pos.x + self.tank_speed
-        ny = terrain.height_at(self.game.map_array, int(nx))
+        ny = self.game.terrain.height_at(int(nx))
         self.pos = Vector2(nx, ny)
 
     def move_left(self):
         nx = self.pos.x - self.tank_speed
-        ny = terrain.height_at(self.game.map_array, int(nx))
+        ny = self.game.terrain.height_at(int(nx))
         self.pos = Vector2(nx, ny)
 
+    def pivot(self) -> Tuple[float, float]:
+        """Point the cannon rotates around, from which the ballistic solver predicts shots."""
+        position = self.tank_cannon.position
+        return position.x, position.y
+
     def fire(self):
         origin_offset = self.tank_cannon.abs_pos(Vector2(1, 0.5))
         force = Vector2(self.projectile_speed, 0).rotated(-self.cannon_angle)
-        self.projectiles.append(Projectile(self.game, origin_offset, force))
+        Projectile.spawn(self.game, origin_offset, force)
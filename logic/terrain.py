@@ -1,6 +1,9 @@
+from typing import Tuple
+
 import numpy as np
 
 from config import Config
+from toolkit.event import Event
 
 
 def constant(w, h, x=None) -> np.ndarray:
@@ -13,6 +16,44 @@ def constant(w, h, x=None) -> np.ndarray:
     return field
 
 
+def fill(surface: np.ndarray, h: int) -> np.ndarray:
+    """
+    Create an RGBA terrain map from its height profile.
+    :param surface: Array of _size w with y coordinate of the terrain surface in each column.
+    :param h: Height of the map in pixels.
+    :return: Array of shape (h, w, 4) and dtype uint8, transparent above the surface.
+    """
+    # 0 above the surface, 1 in the top layer, 2 below it, built by broadcast comparisons straight into uint8
+    rows = np.arange(h, dtype=np.int32)[:, np.newaxis]
+    layer = (rows >= surface[np.newaxis, :]).view(np.uint8)
+    layer += (rows >= surface[np.newaxis, :] + Config.earth_top_depth).view(np.uint8)
+
+    # a pixel as a single uint32, so that the lookup copies one value per pixel rather than four bytes
+    palette = np.array([[0, 0, 0, 0], Config.rgba_earth_top, Config.rgba_earth_bot], dtype=np.uint8).view(np.uint32)
+    return palette[:, 0].take(layer).view(np.uint8).reshape(h, len(surface), 4)
+
+
+def generate(w, h, seed: int | None = None, start_y=None, max_step: int = 1) -> np.ndarray:
+    """
+    Generate a random walk terrain map.
+    Surface moves by a uniformly random step in range [-max_step, max_step] in each column.
+    :param w: Width of the map in pixels.
+    :param h: Height of the map in pixels.
+    :param seed: Seed of the random generator, same seed always produces the same map.
+    :param start_y: Y coordinate of the surface in first column, defaults to middle of the map.
+    :param max_step: Maximal change of surface height between neighbouring columns.
+    :return: Array of shape (h, w, 4) and dtype uint8, see fill().
+    """
+    if start_y is None:
+        start_y = h // 2
+
+    rng = np.random.default_rng(seed)
+    steps = rng.integers(-max_step, max_step + 1, size=w)
+    steps[0] = 0
+    surface = np.clip(start_y + np.cumsum(steps), 0, h - 1)
+    return fill(surface, h)
+
+
 def random_walk(w, h, start_y=None, step_func=None) -> np.ndarray:
     if start_y is None:
         start_y = h // 2
@@ -20,19 +61,84 @@ def random_walk(w, h, start_y=None, step_func=None) -> np.ndarray:
     if step_func is None:
         step_func = lambda y, h, x, w: y
 
-    field = np.zeros((h, w, 4))
-
+    surface = np.empty(w, dtype=np.int64)
     last_y = start_y
-    field[start_y:start_y+10, 0] = Config.rgba_earth_top
-    field[start_y+10:h, 0] = Config.rgba_earth_bot
-    for x in range(2, w):
+    surface[0] = start_y
+    for x in range(1, w):
         last_y = h - step_func(h - last_y, h, x, w)
-        field[last_y:last_y+10, x] = Config.rgba_earth_top
-        field[last_y+10:h, x] = Config.rgba_earth_bot
+        surface[x] = last_y
 
-    return field
+    return fill(surface, h)
+
+
+def surface_heights(mask: np.ndarray) -> np.ndarray:
+    """
+    Find y coordinate of the terrain surface in each column of a mask.
+    :param mask: Boolean array of shape (h, w), True where terrain is solid.
+    :return: Array of _size w with index of the first solid row in each column, or h if the column is empty.
+    """
+    solid = mask.any(axis=0)
+    return np.where(solid, mask.argmax(axis=0), mask.shape[0])
+
+
+class Terrain:
+    """
+    Terrain map together with its collision mask and an index of surface heights.
+    The index is built once and has to be refreshed via update_heights() whenever the mask changes.
+    Edits done through the terrain itself (e.g. carve()) keep map, mask and index in sync
+    and announce the changed region via the `changed` event.
+    """
+
+    def __init__(self, map: np.ndarray):
+        self.map = map
+        """RGBA map of shape (h, w, 4)"""
+        self.mask = map[:, :, 3] > 0
+        """Boolean map of shape (h, w), True where terrain is solid"""
+        self.heights = surface_heights(self.mask)
+        """Y coordinate of the surface in each column"""
+        self.changed = Event()
+        """Raised with bounding box (x0, y0, x1, y1) of every changed region, upper bounds exclusive"""
+
+    @property
+    def width(self) -> int:
+        return self.map.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.map.shape[0]
+
+    def height_at(self, x: int) -> int:
+        """Get y coordinate of the surface in column x, clamped into the map."""
+        x = min(self.width - 1, max(0, x))
+        return int(self.heights[x])
+
+    def heights_at(self, xs: np.ndarray) -> np.ndarray:
+        """Get y coordinates of the surface in columns xs, clamped into the map."""
+        xs = np.clip(np.asarray(xs, dtype=np.int64), 0, self.width - 1)
+        return self.heights[xs]
+
+    def update_heights(self, x0: int = 0, x1: int | None = None):
+        """Recompute surface heights of columns in range [x0, x1) after the mask was changed."""
+        self.heights[x0:x1] = surface_heights(self.mask[:, x0:x1])
+
+    def carve(self, center_x: float, center_y: float, radius: float) -> Tuple[int, int, int, int] | None:
+        """
+        Remove terrain in a disc, e.g. a crater left by an explosion.
+        Only the bounding box of the disc is touched in the map, mask and height index.
+        :return: Changed region (x0, y0, x1, y1) with exclusive upper bounds, or None if the disc is off the map.
+        """
+        x0 = max(0, int(center_x - radius))
+        y0 = max(0, int(center_y - radius))
+        x1 = min(self.width, int(center_x + radius) + 1)
+        y1 = min(self.height, int(center_y + radius) + 1)
+        if x0 >= x1 or y0 >= y1:
+            return None
 
+        ys, xs = np.ogrid[y0:y1, x0:x1]
+        disc = (xs - center_x) ** 2 + (ys - center_y) ** 2 <= radius * radius
+        self.map[y0:y1, x0:x1][disc] = 0
+        self.mask[y0:y1, x0:x1][disc] = False
+        self.update_heights(x0, x1)
 
-def height_at(map: np.ndarray, x: int) -> int:
-    slice = map[:, x, 3]
-    return np.argmax(slice > 0)
+        self.changed(x0, y0, x1, y1)
+        return x0, y0, x1, y1
@@ -2,9 +2,10 @@ import time
 import tkinter as tk
 
 import toolkit.canvas
-from config import Config
-from game_components.renderer import SpriteRenderer
+from config import Config, Layer
+from game_components.renderer import SpriteRenderer, render_layers
 from logic.input import Input
+from toolkit.render_queue import render_queue
 from toolkit.vector import Vector2, PartialVector2
 
 
@@ -17,6 +18,7 @@ class App(tk.Tk):
 
         # bind input handler
         Input.bind(self)
+        render_queue.enabled = Config.render_batching
 
         self.w = w
         self.h = h
@@ -31,7 +33,8 @@ class App(tk.Tk):
                            '../' + Config.res_path_icon,
                            position=Vector2(x, y) * offset + margin,
                            size=PartialVector2(100, None),
-                           anchor=Vector2(0.25 * x, 0.25 * y))
+                           anchor=Vector2(0.25 * x, 0.25 * y),
+                           layer=Layer.TANKS)
             for x in range(5)
             for y in range(5)
         ]
@@ -41,17 +44,18 @@ class App(tk.Tk):
             [
                 toolkit.canvas.draw_x(self.canvas,
                                       Vector2(x, y) * offset + margin, 10,
-                                      "red")
+                                      "red", tags=Layer.GIZMOS.value)
                 for x in range(5)
                 for y in range(5)
             ] + [
                 toolkit.canvas.draw_box(self.canvas,
                                         Vector2(x, y) * offset + margin - Vector2(diag.x * x / 4, diag.y * y / 4),
-                                        diag, "blue")
+                                        diag, "blue", tags=Layer.GIZMOS.value)
                 for x in range(5)
                 for y in range(5)
             ]
         self.gizmos = [i for s in self.gizmos for i in s]
+        render_layers.changed(self.canvas, Layer.GIZMOS.value)
 
         # start custom loop
         self.after(1, self.custom_update)
@@ -59,12 +63,12 @@ class App(tk.Tk):
 
     def custom_update(self):
         delta = time.perf_counter()
+        Input.custom_update(0.001)
         for sprite in self.sprites:
             sprite.rotation += 0.5
-            sprite.custom_update(delta)
-
-        for debug in self.gizmos:
-            self.canvas.tag_raise(debug)
+            sprite.custom_render()
+        render_layers.restack()
+        render_queue.flush()
 
         self.after(1, self.custom_update)
 
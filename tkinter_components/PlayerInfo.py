@@ -12,5 +12,7 @@ class PlayerInfo(tk.Frame):
         self.info = tk.Label(self, text="PLAYER")
         self.info.pack()
 
-        self.health = ttk.Progressbar(self, variable=player.health, maximum=100)
+        self.health_var = tk.IntVar(self, value=player.health)
+        player.health_changed.append(self.health_var.set)
+        self.health = ttk.Progressbar(self, variable=self.health_var, maximum=100)
         self.health.pack()
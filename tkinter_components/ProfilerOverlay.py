@@ -0,0 +1,65 @@
+import tkinter as tk
+
+from config import Config
+from toolkit.profiler import Profiler, percentile
+from toolkit.scheduler import FixedStepScheduler
+
+
+class ProfilerOverlay(tk.Label):
+    """Label drawn over the whole app showing rolling frame-time percentiles and the most expensive sections."""
+
+    refresh_interval = 15
+    """Number of frames between two refreshes of the text, so that the overlay does not cost a frame itself"""
+
+    section_rows = 8
+    """Maximal number of sections listed, most expensive first"""
+
+    def __init__(self, master: tk.Misc, profiler: Profiler, scheduler: FixedStepScheduler):
+        super().__init__(master, justify="left", anchor="nw", font=Config.profiler_font,
+                         bg="black", fg="white")
+        self.profiler = profiler
+        self.scheduler = scheduler
+        self.frames_since_refresh = 0
+        self.shown = False
+
+    def custom_render(self):
+        if Config.debug_mode != self.shown:
+            self.shown = Config.debug_mode
+            if self.shown:
+                self.place(x=Config.screen_pad_x, y=Config.screen_pad_y)
+                self.lift()
+                self.frames_since_refresh = self.refresh_interval
+            else:
+                self.place_forget()
+        if not self.shown:
+            return
+
+        self.frames_since_refresh += 1
+        if self.frames_since_refresh >= self.refresh_interval:
+            self.frames_since_refresh = 0
+            self.configure(text=self.text())
+
+    def text(self) -> str:
+        frames = sorted(self.profiler.frames.history)
+        mean = sum(frames) / len(frames) if len(frames) > 0 else 0
+        updates = sorted(timing.update_time for timing in self.scheduler.timings)
+        renders = sorted(timing.render_time for timing in self.scheduler.timings)
+        dropped = sum(timing.dropped_time for timing in self.scheduler.timings)
+
+        lines = [
+            f"frame  p50 {percentile(frames, 50) * 1000:5.1f}  p95 {percentile(frames, 95) * 1000:5.1f}"
+            f"  p99 {percentile(frames, 99) * 1000:5.1f} ms  {1 / mean if mean > 0 else 0:3.0f} fps",
+            f"update p95 {percentile(updates, 95) * 1000:5.2f}  render p95 {percentile(renders, 95) * 1000:5.2f} ms"
+            f"  dropped {dropped * 1000:.0f} ms",
+        ]
+
+        sections = [(name, metric.summary()) for name, metric in self.profiler.sections.items()]
+        sections.sort(key=lambda item: item[1]["frame_mean"], reverse=True)
+        for name, summary in sections[:self.section_rows]:
+            lines.append(f"{name:<16} mean {summary['frame_mean'] * 1000:6.3f}"
+                         f"  p95 {summary['frame_p95'] * 1000:6.3f}  max {summary['max'] * 1000:6.2f} ms")
+
+        for name, metric in sorted(self.profiler.counters.items()):
+            summary = metric.summary()
+            lines.append(f"{name:<16} {summary['frame_mean']:6.2f} per frame  total {summary['total']:.0f}")
+        return "\n".join(lines)
@@ -18,7 +18,6 @@ class RangeSelector(tk.Frame):
         label_width = None
         if self.width is not None:
             label_width = max(0, self.width - 2 * Config.arrow_w)
-            print("W", label_width)
 
         self.grid_columnconfigure(1, weight=1)
 
@@ -31,6 +30,11 @@ class RangeSelector(tk.Frame):
 
         self.grid_columnconfigure(1, minsize=label_width)
 
+    @property
+    def selected(self) -> any:
+        """Currently selected value, None if nothing is selected"""
+        return self.possible_values[self.value_index] if self.value_index >= 0 else None
+
     def on_minus_press(self):
         if self.value_index <= 0:
             return
@@ -38,7 +42,7 @@ class RangeSelector(tk.Frame):
         self.value_index -= 1
 
     def on_plus_press(self):
-        if self.value_index >= len(self.possible_values):
+        if self.value_index >= len(self.possible_values) - 1:
             return
         self.value.set(self.possible_values[self.value_index + 1])
         self.value_index += 1
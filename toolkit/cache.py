@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    Cache bounded by total size of its values, evicting least recently used values first.
+
+    Size of each value is measured once when it is stored, using the provided `sizeof` function.
+    The most recently stored value is always kept, even if it alone exceeds the budget.
+    Hits, misses and evictions are counted to allow tuning of the budget.
+    Access is guarded by a lock, so the cache may be filled from worker threads.
+    """
+
+    def __init__(self, budget: int, sizeof: Callable[[V], int]):
+        self.budget = budget
+        """Maximal total size of stored values"""
+        self.sizeof = sizeof
+        self.size = 0
+        """Current total size of stored values"""
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[Hashable, Tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        """Check whether value is cached, without counting a hit or miss nor refreshing the value."""
+        return key in self._entries
+
+    def get(self, key: Hashable, default: V | None = None) -> V | None:
+        """Get a cached value and mark it as most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: V):
+        """Store a value, evicting least recently used values until the cache fits into its budget."""
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size)
+            self.size += size
+
+            while self.size > self.budget and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], V]) -> V:
+        """Get a cached value, or create it using factory and store it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
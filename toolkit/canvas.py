@@ -1,5 +1,6 @@
 import tkinter as tk
-from typing import List
+from collections import Counter
+from typing import Any, Dict, List, Tuple
 
 from toolkit.vector import Vector2
 
@@ -57,3 +58,79 @@ def draw_xbox(canvas: tk.Canvas, point: Vector2, size: Vector2, color: str, **kw
         canvas.create_line(left, top, right, bot, fill=color, **kwargs),
         canvas.create_line(right, top, left, bot, fill=color, **kwargs)
     ]
+
+
+class HeadlessCanvas:
+    """
+    Stand-in for tk.Canvas which needs no display.
+    Supports the subset of canvas API used by renderers, items are only tracked by their ids and coordinates.
+    Every call is counted, and optionally recorded, which allows inspecting rendering of headless simulations.
+    """
+
+    def __init__(self, width: int = 0, height: int = 0, record: bool = False):
+        self.width = width
+        self.height = height
+        self.record = record
+        """Whether to store every call in `calls`"""
+        self.calls: List[Tuple[str, tuple, Dict[str, Any]]] = []
+        """Recorded calls in form (method, args, kwargs)"""
+        self.counts: Counter = Counter()
+        """Number of calls of each method"""
+        self.items: Dict[int, List[float]] = {}
+        """Coordinates of every existing item"""
+        self._next_id = 1
+
+    def __track(self, method: str, args: tuple, kwargs: Dict[str, Any]):
+        self.counts[method] += 1
+        if self.record:
+            self.calls.append((method, args, kwargs))
+
+    def __create(self, method: str, args: tuple, kwargs: Dict[str, Any]) -> int:
+        self.__track(method, args, kwargs)
+        item = self._next_id
+        self._next_id += 1
+        self.items[item] = list(args)
+        return item
+
+    def create_image(self, *args, **kwargs) -> int:
+        return self.__create("create_image", args, kwargs)
+
+    def create_line(self, *args, **kwargs) -> int:
+        return self.__create("create_line", args, kwargs)
+
+    def create_oval(self, *args, **kwargs) -> int:
+        return self.__create("create_oval", args, kwargs)
+
+    def create_rectangle(self, *args, **kwargs) -> int:
+        return self.__create("create_rectangle", args, kwargs)
+
+    def create_text(self, *args, **kwargs) -> int:
+        return self.__create("create_text", args, kwargs)
+
+    def coords(self, item: int, *args) -> List[float]:
+        self.__track("coords", (item, *args), {})
+        if len(args) > 0 and item in self.items:
+            self.items[item] = list(args)
+        return self.items.get(item, [])
+
+    def move(self, item: int, dx: float, dy: float):
+        self.__track("move", (item, dx, dy), {})
+        if item in self.items:
+            self.items[item] = [c + (dy if i % 2 else dx) for i, c in enumerate(self.items[item])]
+
+    def itemconfigure(self, item: int, **kwargs):
+        self.__track("itemconfigure", (item,), kwargs)
+
+    itemconfig = itemconfigure
+
+    def delete(self, *items: int):
+        self.__track("delete", items, {})
+        for item in items:
+            self.items.pop(item, None)
+
+    def tag_raise(self, *args):
+        self.__track("tag_raise", args, {})
+
+    def tag_lower(self, *args):
+        self.__track("tag_lower", args, {})
+
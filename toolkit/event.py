@@ -1,19 +1,62 @@
-# Copied from: https://stackoverflow.com/questions/1092531/which-python-packages-offer-a-stand-alone-event-system
+from __future__ import annotations
 
-class Event(list):
+import inspect
+import weakref
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+class Subscription:
+    """Token of a handler subscribed to an Event, cancelling it unsubscribes the handler in constant time."""
+    __slots__ = ("event", "key", "handler", "weak")
+
+    def __init__(self, event: Event, key: Any, handler: Callable | weakref.ref, weak: bool):
+        self.event: Event | None = event
+        """Event the handler is subscribed to, None once cancelled"""
+        self.key = key
+        self.handler = handler
+        """Handler itself, or a weak reference to it"""
+        self.weak = weak
+
+    @property
+    def active(self) -> bool:
+        return self.event is not None
+
+    def resolve(self) -> Callable | None:
+        """Get the handler, None if it was only weakly referenced and is gone."""
+        return self.handler() if self.weak else self.handler
+
+    def cancel(self):
+        """Unsubscribe the handler, does nothing if it is not subscribed anymore."""
+        if self.event is not None:
+            self.event._unsubscribe(self)
+
+
+def _handler_key(handler: Callable) -> Any:
+    """Key identifying a handler without referencing it, bound methods are created anew on every attribute access."""
+    if inspect.ismethod(handler):
+        return id(handler.__self__), handler.__func__
+    return id(handler)
+
+
+class Event:
     """Event subscription.
 
-    A list of callable objects. Calling an instance of this will cause a
-    call to each item in the list in ascending order by index.
+    A set of callable objects kept in order of subscription. Calling an instance of this will cause a
+    call to each subscribed handler in that order. Subscribing returns a Subscription token,
+    handlers may be unsubscribed by the token or by themselves, both in constant time.
+    Subscribed with weak=True, the handler is referenced weakly and unsubscribed once garbage collected,
+    so subscribing a bound method does not keep its object alive.
+    Handlers may subscribe or unsubscribe during dispatch, handlers subscribed during dispatch are first called
+    by the next dispatch, handlers unsubscribed during dispatch are not called anymore.
 
     Example Usage:
     >>> def f(x):
-    ...     print 'f(%s)' % x
+    ...     print('f(%s)' % x)
     >>> def g(x):
-    ...     print 'g(%s)' % x
+    ...     print('g(%s)' % x)
     >>> e = Event()
     >>> e()
-    >>> e.append(f)
+    >>> token = e.append(f)
     >>> e(123)
     f(123)
     >>> e.remove(f)
@@ -22,14 +65,106 @@ class Event(list):
     >>> e(10)
     f(10)
     g(10)
-    >>> del e[0]
+    >>> e.unsubscribe(f)
     >>> e(2)
     g(2)
 
     """
+    __slots__ = ("_subscriptions", "_keys", "_snapshot")
+
+    def __init__(self, handlers: Iterable[Callable] = ()):
+        self._subscriptions: Dict[Subscription, None] = {}
+        """Active subscriptions in order of subscription, dictionary serves as an ordered set"""
+        self._keys: Dict[Any, List[Subscription]] = {}
+        """Active subscriptions by key of their handler, see _handler_key()"""
+        self._snapshot: Tuple[Subscription, ...] | None = None
+        """Subscriptions iterated by dispatch, rebuilt only after a change"""
+        for handler in handlers:
+            self.subscribe(handler)
+
+    def subscribe(self, handler: Callable, weak: bool = False) -> Subscription:
+        """
+        Subscribe handler to the event.
+        :param handler: Callable called with arguments of every dispatch.
+        :param weak: Whether to reference handler only weakly.
+        :return: Token of the subscription.
+        """
+        key = _handler_key(handler)
+        subscription = Subscription(self, key, handler, weak)
+        if weak:
+            on_collected = lambda _: subscription.cancel()
+            subscription.handler = weakref.WeakMethod(handler, on_collected) if inspect.ismethod(handler) \
+                else weakref.ref(handler, on_collected)
+        self._subscriptions[subscription] = None
+        self._keys.setdefault(key, []).append(subscription)
+        self._snapshot = None
+        return subscription
+
+    def append(self, handler: Callable, weak: bool = False) -> Subscription:
+        """Same as subscribe(), kept for code treating the event as a list of handlers."""
+        return self.subscribe(handler, weak)
+
+    def unsubscribe(self, handler: Callable | Subscription):
+        """Unsubscribe by token, or the earliest subscription of handler. Raise ValueError if not subscribed."""
+        if isinstance(handler, Subscription):
+            if handler.event is not self:
+                raise ValueError("Subscription does not belong to this event")
+            self._unsubscribe(handler)
+            return
+        subscriptions = self._keys.get(_handler_key(handler))
+        if not subscriptions:
+            raise ValueError(f"{handler} is not subscribed")
+        self._unsubscribe(subscriptions[0])
+
+    def remove(self, handler: Callable | Subscription):
+        """Same as unsubscribe(), kept for code treating the event as a list of handlers."""
+        self.unsubscribe(handler)
+
+    def _unsubscribe(self, subscription: Subscription):
+        del self._subscriptions[subscription]
+        subscriptions = self._keys[subscription.key]
+        subscriptions.remove(subscription)
+        if len(subscriptions) == 0:
+            del self._keys[subscription.key]
+        subscription.event = None
+        self._snapshot = None
+
+    def clear(self):
+        for subscription in self._subscriptions:
+            subscription.event = None
+        self._subscriptions.clear()
+        self._keys.clear()
+        self._snapshot = None
+
+    def __iadd__(self, handlers: Callable | Iterable[Callable]):
+        if callable(handlers):
+            handlers = (handlers,)
+        for handler in handlers:
+            self.subscribe(handler)
+        return self
+
     def __call__(self, *args, **kwargs):
-        for f in self:
-            f(*args, **kwargs)
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = tuple(self._subscriptions)
+        for subscription in snapshot:
+            if subscription.event is None:
+                continue
+            handler = subscription.handler() if subscription.weak else subscription.handler
+            if handler is not None:
+                handler(*args, **kwargs)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def __iter__(self) -> Iterator[Callable]:
+        for subscription in tuple(self._subscriptions):
+            handler = subscription.resolve()
+            if handler is not None:
+                yield handler
+
+    def __contains__(self, handler: Callable):
+        return _handler_key(handler) in self._keys
 
     def __repr__(self):
-        return "Event(%s)" % list.__repr__(self)
\ No newline at end of file
+        return "Event(%s)" % list(self)
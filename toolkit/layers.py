@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import tkinter as tk
+import weakref
+from typing import Sequence
+
+from toolkit.render_queue import render_queue
+
+
+class RenderLayers:
+    """
+    Z-order of canvas items by named layers, each layer being a canvas tag.
+
+    Items are created with the tag of their layer and end up on top of the display list, above all layers.
+    Once a layer gained items, it and all layers above it are raised in order from bottom to top, which puts
+    the new items back into place. Layers below the lowest changed one are not touched, and nothing is
+    restacked in frames without new items. Raises go through the render queue, i.e. into the frame flush.
+
+    Example Usage:
+    >>> layers = RenderLayers(["sky", "terrain", "gizmos"])
+    >>> canvas.create_line(0, 0, 10, 10, tags="gizmos")
+    >>> layers.changed(canvas, "gizmos")
+    >>> layers.restack()  # a single "raise gizmos"
+    """
+
+    def __init__(self, order: Sequence[str]):
+        self.order = list(order)
+        """Tags of layers from bottom to top"""
+        self._index = {tag: i for i, tag in enumerate(self.order)}
+        self._lowest_changed: weakref.WeakKeyDictionary[tk.Canvas, int] = weakref.WeakKeyDictionary()
+        """Index of the lowest layer which gained items since the last restack, by canvas"""
+
+    def changed(self, canvas: tk.Canvas, layer: str):
+        """Notify that items were created in layer, so that layers get restacked on next restack()."""
+        index = self._index[layer]
+        lowest = self._lowest_changed.get(canvas)
+        if lowest is None or index < lowest:
+            self._lowest_changed[canvas] = index
+
+    def restack(self):
+        """Restack layers of canvases whose layers changed, call once per frame before the render queue flush."""
+        if len(self._lowest_changed) == 0:
+            return
+        for canvas, lowest in list(self._lowest_changed.items()):
+            for tag in self.order[lowest:]:
+                render_queue.tag_raise(canvas, tag)
+        self._lowest_changed.clear()
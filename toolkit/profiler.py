@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import collections
+import json
+import time
+from typing import Any, Callable, Deque, Dict, Iterable, List
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Value below which p percent of sorted values lie, 0 for no values."""
+    if len(ordered) == 0:
+        return 0
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class Metric:
+    """Per-frame totals of a timed section or a counter, lifetime totals and a rolling window of recent frames."""
+    __slots__ = ("name", "calls", "total", "max", "frame", "history")
+
+    def __init__(self, name: str, history: int):
+        self.name = name
+        self.calls = 0
+        """Number of times the section was entered or the counter was increased"""
+        self.total = 0.0
+        """Sum of all values, seconds for sections"""
+        self.max = 0.0
+        """Largest single value"""
+        self.frame = 0.0
+        """Sum of values in the current frame"""
+        self.history: Deque[float] = collections.deque(maxlen=history)
+        """Sums of values of recent frames"""
+
+    def add(self, value: float):
+        self.calls += 1
+        self.total += value
+        self.frame += value
+        if value > self.max:
+            self.max = value
+
+    def end_frame(self):
+        self.history.append(self.frame)
+        self.frame = 0.0
+
+    def summary(self, percentiles: Iterable[float] = (50, 95, 99)) -> Dict[str, float]:
+        ordered = sorted(self.history)
+        result = {
+            "calls": self.calls,
+            "total": self.total,
+            "max": self.max,
+            "frame_mean": sum(ordered) / len(ordered) if len(ordered) > 0 else 0,
+        }
+        for p in percentiles:
+            result[f"frame_p{p:g}"] = percentile(ordered, p)
+        return result
+
+
+class _Section:
+    """Context measuring a single entry into a timed section."""
+    __slots__ = ("metric", "start")
+
+    def __init__(self, metric: Metric):
+        self.metric = metric
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metric.add(time.perf_counter() - self.start)
+
+
+class _NullSection:
+    """Context doing nothing, used while profiling is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NULL_SECTION = _NullSection()
+
+
+class Profiler:
+    """
+    Instrumentation of hot paths by scoped timers and counters, aggregated per frame.
+
+    Example Usage:
+    >>> with profiler.section("physics"):
+    ...     system.step(delta)
+    >>> profiler.count("image_cache_miss")
+    >>> profiler.end_frame()
+
+    Timers and counters are meant to be used from the Tk thread only.
+    """
+
+    def __init__(self, history: int = 300, enabled: bool = True):
+        self.enabled = enabled
+        """Flag whether sections and counters are recorded, disabled profiler costs a single check per call"""
+        self.history = history
+        """Number of recent frames kept for percentiles"""
+        self.sections: Dict[str, Metric] = {}
+        """Timed sections by name, values in seconds"""
+        self.counters: Dict[str, Metric] = {}
+        """Counters by name"""
+        self.frames = Metric("frame", history)
+        """Time between two ends of frame, i.e. the frame time seen by the player"""
+        self._frame_end: float | None = None
+
+    def section(self, name: str) -> _Section | _NullSection:
+        """Context manager timing the enclosed block as a part of the section called name."""
+        if not self.enabled:
+            return _NULL_SECTION
+        metric = self.sections.get(name)
+        if metric is None:
+            metric = self.sections[name] = Metric(name, self.history)
+        return _Section(metric)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """Decorator timing every call of the decorated function as a part of the section called name."""
+        def decorator(fn: Callable) -> Callable:
+            def wrapper(*args, **kwargs):
+                with self.section(name):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            return wrapper
+        return decorator
+
+    def count(self, name: str, value: float = 1):
+        """Increase the counter called name."""
+        if not self.enabled:
+            return
+        metric = self.counters.get(name)
+        if metric is None:
+            metric = self.counters[name] = Metric(name, self.history)
+        metric.add(value)
+
+    def end_frame(self, now: float | None = None):
+        """Close the current frame, moving per-frame totals of all sections and counters into their history."""
+        if not self.enabled:
+            return
+        now = time.perf_counter() if now is None else now
+        if self._frame_end is not None:
+            self.frames.add(now - self._frame_end)
+            self.frames.end_frame()
+        self._frame_end = now
+        for metric in self.sections.values():
+            metric.end_frame()
+        for metric in self.counters.values():
+            metric.end_frame()
+
+    def reset(self):
+        self.sections.clear()
+        self.counters.clear()
+        self.frames = Metric("frame", self.history)
+        self._frame_end = None
+
+    def report(self) -> Dict[str, Any]:
+        """Statistics of frame times, all sections and counters, times in seconds."""
+        return {
+            "frame": self.frames.summary(),
+            "sections": {name: metric.summary() for name, metric in sorted(self.sections.items())},
+            "counters": {name: metric.summary() for name, metric in sorted(self.counters.items())},
+        }
+
+    def dump(self, path: str):
+        """Write report() as JSON into a file at path."""
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+            file.write("\n")
+
+
+profiler = Profiler()
+"""Profiler shared by the whole game"""
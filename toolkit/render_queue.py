@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import tkinter as tk
+from typing import Any, Dict, List, Tuple
+
+from toolkit.profiler import profiler
+
+
+def _tcl_word(value: Any) -> str:
+    """Format value as a single Tcl word, lists become Tcl lists and images their names."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(float(value)) if isinstance(value, float) else str(value)
+    if isinstance(value, (tuple, list)):
+        return "{" + " ".join(_tcl_word(v) for v in value) + "}"
+    text = str(value)
+    if text == "" or any(c in text for c in " \t\n{}[]$\"\\;"):
+        return "{" + text + "}"
+    return text
+
+
+class _Batch:
+    """Pending mutations of items of a single canvas."""
+    __slots__ = ("coords", "moves", "configs", "deletes", "restacks")
+
+    def __init__(self):
+        self.coords: Dict[int, List[float]] = {}
+        """Absolute coordinates by item, the last ones set win"""
+        self.moves: Dict[int, List[float]] = {}
+        """Accumulated offsets [dx, dy] by item, of items without pending coordinates"""
+        self.configs: Dict[int, Dict[str, Any]] = {}
+        """Options by item, merged in order of configuring"""
+        self.deletes: Dict[int, None] = {}
+        """Deleted items, dictionary serves as an ordered set"""
+        self.restacks: List[Tuple[str, tuple]] = []
+        """Raise and lower operations in order of calls, stacking does not commute"""
+
+    def __len__(self):
+        return len(self.coords) + len(self.moves) + len(self.configs) + len(self.deletes) + len(self.restacks)
+
+    def commands(self) -> int:
+        """Number of canvas commands the batch flushes into, all deletes are a single command."""
+        return len(self) - len(self.deletes) + (len(self.deletes) > 0)
+
+
+class RenderQueue:
+    """
+    Frame-level queue of canvas mutations, flushed in a single pass at the end of each frame.
+
+    Renderers call the queue instead of the canvas. Repeated moves of an item collapse into a single
+    `coords` or `move`, options of an item are merged into a single `itemconfigure`, and mutations of
+    deleted items are dropped. The flush of a tk.Canvas is one Tcl script evaluated at once,
+    rather than a Tcl round trip per call. Items are still created directly, as their ids are needed immediately.
+
+    Example Usage:
+    >>> render_queue.coords(canvas, item, 10, 20)
+    >>> render_queue.move(canvas, item, 5, 0)
+    >>> render_queue.flush()  # a single "coords item 15 20"
+
+    While disabled, every call is passed to the canvas right away, so code running without a frame loop
+    (headless simulation, benchmarks) does not need to flush.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        """Flag whether mutations are queued, otherwise they are passed through immediately"""
+        self._batches: Dict[Any, _Batch] = {}
+        """Pending mutations by canvas"""
+
+    def __batch(self, canvas: tk.Canvas) -> _Batch:
+        batch = self._batches.get(canvas)
+        if batch is None:
+            batch = self._batches[canvas] = _Batch()
+        return batch
+
+    def coords(self, canvas: tk.Canvas, item: int, *coords: float):
+        """Set coordinates of an item, overriding its pending moves."""
+        if not self.enabled:
+            canvas.coords(item, *coords)
+            return
+        profiler.count("canvas_queued")
+        batch = self.__batch(canvas)
+        if item in batch.deletes:
+            return
+        batch.moves.pop(item, None)
+        batch.coords[item] = list(coords)
+
+    def move(self, canvas: tk.Canvas, item: int, dx: float, dy: float):
+        """Move an item by an offset, folded into its pending coordinates or moves."""
+        if not self.enabled:
+            canvas.move(item, dx, dy)
+            return
+        profiler.count("canvas_queued")
+        batch = self.__batch(canvas)
+        if item in batch.deletes:
+            return
+        coords = batch.coords.get(item)
+        if coords is not None:
+            for i in range(len(coords)):
+                coords[i] += dy if i % 2 else dx
+            return
+        offset = batch.moves.get(item)
+        if offset is None:
+            batch.moves[item] = [dx, dy]
+        else:
+            offset[0] += dx
+            offset[1] += dy
+
+    def itemconfigure(self, canvas: tk.Canvas, item: int, **options):
+        """Configure options of an item, merged with its pending options."""
+        if not self.enabled:
+            canvas.itemconfigure(item, **options)
+            return
+        profiler.count("canvas_queued")
+        batch = self.__batch(canvas)
+        if item in batch.deletes:
+            return
+        batch.configs.setdefault(item, {}).update(options)
+
+    def delete(self, canvas: tk.Canvas, *items: int):
+        """Delete items, dropping their pending mutations."""
+        if len(items) == 0:
+            return
+        if not self.enabled:
+            canvas.delete(*items)
+            return
+        profiler.count("canvas_queued")
+        batch = self.__batch(canvas)
+        for item in items:
+            batch.coords.pop(item, None)
+            batch.moves.pop(item, None)
+            batch.configs.pop(item, None)
+            batch.deletes[item] = None
+
+    def tag_raise(self, canvas: tk.Canvas, tag_or_id: str | int, above: str | int | None = None):
+        """Raise items above all others, or above `above`."""
+        self.__restack(canvas, "raise", tag_or_id, above)
+
+    def tag_lower(self, canvas: tk.Canvas, tag_or_id: str | int, below: str | int | None = None):
+        """Lower items below all others, or below `below`."""
+        self.__restack(canvas, "lower", tag_or_id, below)
+
+    def __restack(self, canvas: tk.Canvas, command: str, tag_or_id: str | int, reference: str | int | None):
+        args = (tag_or_id,) if reference is None else (tag_or_id, reference)
+        if not self.enabled:
+            (canvas.tag_raise if command == "raise" else canvas.tag_lower)(*args)
+            return
+        profiler.count("canvas_queued")
+        self.__batch(canvas).restacks.append((command, args))
+
+    def __len__(self):
+        return sum(len(batch) for batch in self._batches.values())
+
+    def flush(self):
+        """Apply all pending mutations, a single Tcl evaluation per tk.Canvas."""
+        if len(self._batches) == 0:
+            return
+        batches = self._batches
+        self._batches = {}
+        with profiler.section("canvas_flush"):
+            for canvas, batch in batches.items():
+                if len(batch) == 0:
+                    continue
+                profiler.count("canvas_flushed", batch.commands())
+                if isinstance(canvas, tk.Canvas):
+                    self.__flush_tcl(canvas, batch)
+                else:
+                    self.__flush_calls(canvas, batch)
+
+    @staticmethod
+    def __flush_tcl(canvas: tk.Canvas, batch: _Batch):
+        path = canvas._w
+        commands = []
+        if len(batch.deletes) > 0:
+            commands.append(f"{path} delete {' '.join(str(item) for item in batch.deletes)}")
+        for item, options in batch.configs.items():
+            words = " ".join(f"-{name} {_tcl_word(value)}" for name, value in options.items())
+            commands.append(f"{path} itemconfigure {item} {words}")
+        for item, coords in batch.coords.items():
+            commands.append(f"{path} coords {item} {' '.join(repr(float(c)) for c in coords)}")
+        for item, (dx, dy) in batch.moves.items():
+            commands.append(f"{path} move {item} {float(dx)!r} {float(dy)!r}")
+        for command, args in batch.restacks:
+            commands.append(f"{path} {command} {' '.join(_tcl_word(arg) for arg in args)}")
+        canvas.tk.eval("\n".join(commands))
+
+    @staticmethod
+    def __flush_calls(canvas: Any, batch: _Batch):
+        """Flush into a canvas stand-in such as HeadlessCanvas, through its regular methods."""
+        if len(batch.deletes) > 0:
+            canvas.delete(*batch.deletes)
+        for item, options in batch.configs.items():
+            canvas.itemconfigure(item, **options)
+        for item, coords in batch.coords.items():
+            canvas.coords(item, *coords)
+        for item, (dx, dy) in batch.moves.items():
+            canvas.move(item, dx, dy)
+        for command, args in batch.restacks:
+            (canvas.tag_raise if command == "raise" else canvas.tag_lower)(*args)
+
+
+render_queue = RenderQueue()
+"""Render queue shared by all canvases, enabled and flushed by the app once per frame"""
@@ -0,0 +1,99 @@
+import time
+from collections import deque
+from typing import Deque, NamedTuple
+
+
+class TickTiming(NamedTuple):
+    """Timing report of a single scheduler tick, durations are in seconds."""
+    steps: int
+    """Number of fixed simulation steps run during the tick"""
+    update_time: float
+    """Time spent running simulation steps"""
+    render_time: float
+    """Time spent rendering"""
+    dropped_time: float
+    """Simulation time discarded by the catch-up clamp"""
+
+
+class FixedStepScheduler:
+    """
+    Game loop clock running the simulation in fixed steps, independent of rendering.
+
+    Wall-clock time is collected in an accumulator and consumed in steps of exactly `step` seconds,
+    so simulation results do not depend on machine load.
+    If the host falls behind, at most `max_steps` are run per tick and remaining lag is dropped
+    (game slows down instead of spiralling into ever longer ticks).
+    Rendering happens at most once per tick, ticks are spaced by `render_interval`,
+    and `alpha` gives the fraction of a step left in the accumulator for interpolation.
+    """
+
+    def __init__(self, step_rate: float, render_rate: float, max_steps: int, history: int = 120):
+        self.step = 1.0 / step_rate
+        """Duration of a single simulation step in seconds"""
+        self.render_interval = 1.0 / render_rate
+        """Minimal duration between two rendered frames in seconds"""
+        self.max_steps = max_steps
+        """Maximal number of simulation steps run during a single tick"""
+
+        self.accumulator = 0.0
+        self.last_time: float | None = None
+        self.tick_start: float | None = None
+        self.dropped_time = 0.0
+
+        self.timings: Deque[TickTiming] = deque(maxlen=history)
+        """Timing reports of the most recent ticks"""
+
+    @property
+    def alpha(self) -> float:
+        """Interpolation factor between previous and current simulation state, in range [0, 1)"""
+        return self.accumulator / self.step
+
+    @property
+    def last_timing(self) -> TickTiming | None:
+        return self.timings[-1] if len(self.timings) > 0 else None
+
+    def reset(self, now: float | None = None):
+        """Restart the clock, discarding any accumulated time."""
+        self.last_time = time.perf_counter() if now is None else now
+        self.accumulator = 0.0
+
+    def advance(self, now: float | None = None) -> int:
+        """
+        Start a new tick and collect elapsed time.
+        :param now: Current time as returned by time.perf_counter(), taken if not provided.
+        :return: Number of simulation steps to run during this tick.
+        """
+        if now is None:
+            now = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = now
+
+        self.tick_start = now
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.accumulator // self.step)
+        self.dropped_time = 0.0
+        if steps > self.max_steps:
+            self.dropped_time = (steps - self.max_steps) * self.step
+            self.accumulator -= self.dropped_time
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+        return steps
+
+    def record(self, steps: int, update_time: float, render_time: float) -> TickTiming:
+        """Store timing report of the current tick."""
+        timing = TickTiming(steps, update_time, render_time, self.dropped_time)
+        self.timings.append(timing)
+        return timing
+
+    def next_delay(self, now: float | None = None) -> int:
+        """
+        Get delay until the next tick should start.
+        :param now: Current time as returned by time.perf_counter(), taken if not provided.
+        :return: Delay in whole milliseconds, at least 1.
+        """
+        if now is None:
+            now = time.perf_counter()
+        remaining = self.render_interval - (now - self.tick_start)
+        return max(1, int(remaining * 1000))
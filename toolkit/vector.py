@@ -1,9 +1,22 @@
 from __future__ import annotations
 
 import math
+from typing import Iterable, Iterator, overload
+
+import numpy as np
+
+
+_NUMBERS = (int, float)
 
 
 class Vector2:
+    """
+    Two-dimensional vector.
+    Arithmetic operators create new vectors, in-place operators (+=, -=, *=, /=) modify the vector itself,
+    so they must not be used on vectors shared with other objects (e.g. returned by a position property).
+    """
+    __slots__ = ("x", "y")
+
     x: float
     """X coordinate of the vector"""
 
@@ -11,7 +24,10 @@ class Vector2:
     """Y coordinate of the vector"""
 
     def __init__(self, x: float | Vector2 = 0, y: float = 0):
-        if isinstance(x, Vector2):
+        if x.__class__ in _NUMBERS:
+            self.x = x
+            self.y = y
+        elif isinstance(x, Vector2):
             self.x = x.x
             self.y = x.y
         else:
@@ -22,18 +38,58 @@ class Vector2:
         return Vector2(-self.x, -self.y)
 
     def __add__(self, other: Vector2 | float):
-        if isinstance(other, Vector2):
+        if other.__class__ is Vector2 or isinstance(other, Vector2):
             return Vector2(self.x + other.x, self.y + other.y)
+        if isinstance(other, Vector2Array):
+            return NotImplemented
         return Vector2(self.x + other, self.y + other)
 
     def __sub__(self, other: Vector2 | float):
-        return self + -other
+        if other.__class__ is Vector2 or isinstance(other, Vector2):
+            return Vector2(self.x - other.x, self.y - other.y)
+        if isinstance(other, Vector2Array):
+            return NotImplemented
+        return Vector2(self.x - other, self.y - other)
 
     def __mul__(self, other: Vector2 | float):
-        if isinstance(other, Vector2):
+        if other.__class__ is Vector2 or isinstance(other, Vector2):
             return Vector2(self.x * other.x, self.y * other.y)
+        if isinstance(other, Vector2Array):
+            return NotImplemented
         return Vector2(self.x * other, self.y * other)
 
+    def __iadd__(self, other: Vector2 | float):
+        if other.__class__ is Vector2 or isinstance(other, Vector2):
+            self.x += other.x
+            self.y += other.y
+        else:
+            self.x += other
+            self.y += other
+        return self
+
+    def __isub__(self, other: Vector2 | float):
+        if other.__class__ is Vector2 or isinstance(other, Vector2):
+            self.x -= other.x
+            self.y -= other.y
+        else:
+            self.x -= other
+            self.y -= other
+        return self
+
+    def __imul__(self, other: Vector2 | float):
+        if other.__class__ is Vector2 or isinstance(other, Vector2):
+            self.x *= other.x
+            self.y *= other.y
+        else:
+            self.x *= other
+            self.y *= other
+        return self
+
+    def __itruediv__(self, other: float):
+        self.x /= other
+        self.y /= other
+        return self
+
     def __matmul__(self, other: Vector2):
         return self.x * other.x + self.y * other.y
 
@@ -50,6 +106,9 @@ class Vector2:
         return Vector2(self.x / other, self.y / other)
 
     def __eq__(self, other: Vector2):
+        # exact comparison first, it decides most comparisons without calling math.isclose
+        if self.x == other.x and self.y == other.y:
+            return True
         return math.isclose(self.x, other.x) and math.isclose(self.y, other.y)
 
     def __ne__(self, other: Vector2):
@@ -84,13 +143,31 @@ class Vector2:
     def area(self) -> float:
         return self.x * self.y
 
+    def set(self, x: float, y: float) -> Vector2:
+        """Set both coordinates in place."""
+        self.x = x
+        self.y = y
+        return self
+
+    def add_scaled(self, other: Vector2, scale: float) -> Vector2:
+        """Add other vector multiplied by scale in place, i.e. self += other * scale without a temporary vector."""
+        self.x += other.x * scale
+        self.y += other.y * scale
+        return self
+
     def rotated(self, degrees: float) -> Vector2:
         radians = math.radians(degrees)
+        cos = math.cos(radians)
+        sin = math.sin(radians)
         return Vector2(
-            self.x * math.cos(radians) - self.y * math.sin(radians),
-            self.x * math.sin(radians) + self.y * math.cos(radians)
+            self.x * cos - self.y * sin,
+            self.x * sin + self.y * cos
         )
 
+    def clamped(self, lower: Vector2, upper: Vector2) -> Vector2:
+        """Vector with each coordinate limited to the range given by lower and upper."""
+        return Vector2(min(max(self.x, lower.x), upper.x), min(max(self.y, lower.y), upper.y))
+
     def as_int(self):
         return Vector2(int(self.x), int(self.y))
 
@@ -99,6 +176,8 @@ class Vector2:
 
 
 class PartialVector2(Vector2):
+    __slots__ = ()
+
     x: float | None
     """X coordinate of the vector"""
 
@@ -133,6 +212,19 @@ class PartialVector2(Vector2):
         )
         return result
 
+    # coordinates may be missing, so in-place operators fall back to creating a new vector
+    def __iadd__(self, other: Vector2):
+        return self + other
+
+    def __isub__(self, other: Vector2):
+        return self - other
+
+    def __imul__(self, other: float):
+        return self * other
+
+    def __itruediv__(self, other: Vector2 | float):
+        return self / other
+
     def __matmul__(self, other: Vector2):
         assert self.is_valid and (not isinstance(other, PartialVector2) or other.is_valid)
         return self.x * other.x + self.y * other.y
@@ -218,3 +310,153 @@ class PartialVector2(Vector2):
 
     def __repr__(self):
         return f"PartialVector2({self.x},{self.y})"
+
+
+class Vector2Array:
+    """
+    Batch of N two-dimensional vectors backed by an (N, 2) NumPy array, row i holding x and y of i-th vector.
+    Supports the operations of Vector2 on all vectors at once. Second operand of an operation may be
+    another Vector2Array of the same length, a single Vector2 applied to every row, a scalar,
+    or a 1-D array of N scalars applied row by row.
+    """
+    __slots__ = ("data",)
+
+    data: np.ndarray
+    """Underlying (N, 2) float array, shared rather than copied where possible"""
+
+    def __init__(self, data: np.ndarray | Iterable[Iterable[float]]):
+        self.data = np.asarray(data, dtype=float).reshape(-1, 2)
+
+    @staticmethod
+    def zeros(n: int) -> Vector2Array:
+        return Vector2Array(np.zeros((n, 2)))
+
+    @staticmethod
+    def from_vectors(vectors: Iterable[Vector2]) -> Vector2Array:
+        return Vector2Array([(v.x, v.y) for v in vectors])
+
+    def to_vectors(self) -> list[Vector2]:
+        return [Vector2(x, y) for x, y in self.data.tolist()]
+
+    @property
+    def x(self) -> np.ndarray:
+        """View of the X coordinates"""
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        """View of the Y coordinates"""
+        return self.data[:, 1]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[Vector2]:
+        return iter(self.to_vectors())
+
+    @overload
+    def __getitem__(self, index: int) -> Vector2: ...
+
+    @overload
+    def __getitem__(self, index: slice | np.ndarray) -> Vector2Array: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            x, y = self.data[index].tolist()
+            return Vector2(x, y)
+        return Vector2Array(self.data[index])
+
+    def __setitem__(self, index, value: Vector2 | Vector2Array):
+        self.data[index] = Vector2Array._operand(value)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    @staticmethod
+    def _operand(other: Vector2Array | Vector2 | np.ndarray | float):
+        """Second operand of an operation in a form broadcasting against the (N, 2) data."""
+        if isinstance(other, Vector2Array):
+            return other.data
+        if isinstance(other, Vector2):
+            return np.array((other.x, other.y), dtype=float)
+        if isinstance(other, np.ndarray) and other.ndim == 1:
+            return other[:, np.newaxis]
+        return other
+
+    def __neg__(self):
+        return Vector2Array(-self.data)
+
+    def __add__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        return Vector2Array(self.data + Vector2Array._operand(other))
+
+    def __sub__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        return Vector2Array(self.data - Vector2Array._operand(other))
+
+    def __mul__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        return Vector2Array(self.data * Vector2Array._operand(other))
+
+    def __truediv__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        return Vector2Array(self.data / Vector2Array._operand(other))
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __rsub__(self, other: Vector2 | np.ndarray | float):
+        return Vector2Array(Vector2Array._operand(other) - self.data)
+
+    def __iadd__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        self.data += Vector2Array._operand(other)
+        return self
+
+    def __isub__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        self.data -= Vector2Array._operand(other)
+        return self
+
+    def __imul__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        self.data *= Vector2Array._operand(other)
+        return self
+
+    def __itruediv__(self, other: Vector2Array | Vector2 | np.ndarray | float):
+        self.data /= Vector2Array._operand(other)
+        return self
+
+    def __matmul__(self, other: Vector2Array | Vector2) -> np.ndarray:
+        """Dot products row by row."""
+        return (self.data * Vector2Array._operand(other)).sum(axis=1)
+
+    def __abs__(self):
+        return Vector2Array(np.abs(self.data))
+
+    @property
+    def magnitude(self) -> np.ndarray:
+        return np.hypot(self.data[:, 0], self.data[:, 1])
+
+    @property
+    def sqr_magnitude(self) -> np.ndarray:
+        return np.einsum("ij,ij->i", self.data, self.data)
+
+    @property
+    def normalized(self) -> Vector2Array:
+        """Unit vectors, vectors of zero length stay zero instead of failing the whole batch."""
+        magnitude = self.magnitude
+        return Vector2Array(np.divide(self.data, magnitude[:, np.newaxis],
+                                      out=np.zeros_like(self.data), where=magnitude[:, np.newaxis] != 0))
+
+    def rotated(self, degrees: float | np.ndarray) -> Vector2Array:
+        """Vectors rotated by the same angle, or each by its own angle given as 1-D array."""
+        radians = np.radians(degrees)
+        cos = np.cos(radians)
+        sin = np.sin(radians)
+        x = self.data[:, 0]
+        y = self.data[:, 1]
+        return Vector2Array(np.column_stack((x * cos - y * sin, x * sin + y * cos)))
+
+    def clamped(self, lower: Vector2, upper: Vector2) -> Vector2Array:
+        return Vector2Array(np.clip(self.data, Vector2Array._operand(lower), Vector2Array._operand(upper)))
+
+    def as_int(self) -> np.ndarray:
+        """Coordinates truncated towards zero like Vector2.as_int, as an (N, 2) integer array usable for indexing."""
+        return self.data.astype(int)
+
+    def __repr__(self):
+        return f"Vector2Array({self.data.tolist()})"
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import queue
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Tuple
+
+
+class WorkerPool:
+    """
+    Thread pool running work off the Tk thread.
+
+    Tk must only be touched from the thread running its mainloop, so results are not handed to callbacks
+    directly from workers. Finished futures are queued instead and the queue is drained by polling
+    via `after` on the bound Tk widget, so every callback runs on the Tk thread.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="WorkerPool")
+        self._done: queue.SimpleQueue[Tuple[Future, Callable[[Any], None]]] = queue.SimpleQueue()
+        self._master: tk.Misc | None = None
+        self._poll_interval = 10
+
+    @property
+    def bound(self) -> bool:
+        """Flag whether results are delivered to callbacks, i.e. pool is bound to a running Tk widget"""
+        return self._master is not None
+
+    def bind(self, master: tk.Misc, poll_interval: int = 10):
+        """
+        Start delivering results to callbacks on the Tk thread of master.
+        :param master: Any Tk widget, used for scheduling of polling.
+        :param poll_interval: Delay between two polls of finished work in milliseconds.
+        """
+        self._master = master
+        self._poll_interval = poll_interval
+        self._master.after(self._poll_interval, self.poll)
+
+    def submit(self, fn: Callable, *args, callback: Callable[[Any], None] | None = None, **kwargs) -> Future:
+        """
+        Run fn(*args, **kwargs) on a worker thread.
+        :param callback: Called with result of fn on the Tk thread, once the pool is bound and polled.
+        :return: Future of the result, which may also be waited upon directly.
+        """
+        future = self._executor.submit(fn, *args, **kwargs)
+        if callback is not None:
+            self.when_done(future, callback)
+        return future
+
+    def when_done(self, future: Future, callback: Callable[[Any], None]):
+        """Call callback with result of an already submitted future on the Tk thread, once the future is done."""
+        future.add_done_callback(lambda f: self._done.put((f, callback)))
+
+    def poll(self):
+        """Deliver results of finished work to their callbacks, called periodically once bound."""
+        # reschedule first, so that a failing callback does not stop the polling
+        if self._master is not None:
+            self._master.after(self._poll_interval, self.poll)
+
+        while True:
+            try:
+                future, callback = self._done.get_nowait()
+            except queue.Empty:
+                break
+            callback(future.result())
+
+    def shutdown(self):
+        """Stop polling and discard work which has not started yet."""
+        self._master = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,23 +1,90 @@
 import math
+import threading
 import tkinter as tk
-from functools import cache
-from typing import Literal, Tuple, TypeVar
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Literal, Tuple, TypeVar
 
 import PIL.Image
 import numpy as np
 from PIL import Image
 from PIL import ImageTk
 
+from config import Config
+from toolkit.cache import LRUCache
+from toolkit.profiler import profiler
 from toolkit.vector import Vector2
+from toolkit.worker import WorkerPool
 
 C = TypeVar("C")
 
+image_cache: LRUCache[Image.Image] = LRUCache(Config.image_cache_budget,
+                                               lambda image: image.width * image.height * len(image.getbands()))
+"""Cache of processed PIL images, keyed by arguments of load_image"""
 
-def __force_cache(path: str, height: int | None = None, width: int | None = None):
-    for flip_h in [True, False]:
-        for flip_v in [True, False]:
-            for degree in range(360):
-                __load_image(path, height, width, flip_h, flip_v, degree)
+photo_cache: LRUCache[tk.PhotoImage] = LRUCache(Config.photo_cache_budget,
+                                                 lambda photo: photo.width() * photo.height() * 4)
+"""Cache of processed photos, keyed by arguments of load_photo"""
+
+atlas_cache: LRUCache["RotationAtlas"] = LRUCache(Config.atlas_cache_budget, lambda atlas: atlas.nbytes)
+"""Cache of rotation atlases, keyed by arguments of load_atlas"""
+
+asset_pool = WorkerPool(Config.asset_workers)
+"""Worker threads preparing images in background, bound to the app to deliver results on the Tk thread"""
+
+_pending_images: Dict[tuple, Future] = {}
+"""Images being prepared by asset_pool, keyed as in image_cache"""
+_pending_lock = threading.Lock()
+
+
+class HeadlessPhoto:
+    """Stand-in for tk.PhotoImage used in headless mode, keeps only the PIL image."""
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+
+    def width(self) -> int:
+        return self.image.width
+
+    def height(self) -> int:
+        return self.image.height
+
+
+def make_photo(image: Image.Image) -> tk.PhotoImage:
+    """Convert PIL image to a photo, which is a HeadlessPhoto in headless mode."""
+    if Config.headless:
+        return HeadlessPhoto(image)
+    return ImageTk.PhotoImage(image)
+
+
+def prewarm(path: str, height: int | None = None, width: int | None = None,
+            rotations: Iterable[int] = range(360),
+            flips: Iterable[Tuple[bool, bool]] = ((False, False),),
+            photos: bool = True):
+    """
+    Load all variants of an asset into cache ahead of time, so that they are not processed during gameplay.
+    Keep in mind each variant counts against the cache budget.
+    :param path: Relative path to image
+    :param height: Target height in pixels to resize to, or None.
+    :param width: Target width in pixels to resize to, or None.
+    :param rotations: Angles in degrees to prepare.
+    :param flips: Combinations of (flip_h, flip_v) to prepare.
+    :param photos: Whether to also prepare tk.PhotoImages, which requires a Tk root to exist.
+    """
+    for flip_h, flip_v in flips:
+        for degree in rotations:
+            if photos:
+                load_photo(path, height, width, flip_h, flip_v, degree)
+            else:
+                load_image(path, height, width, flip_h, flip_v, degree)
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Get hit/miss/eviction counters and memory usage of image caches."""
+    return {
+        "image": image_cache.stats(),
+        "photo": photo_cache.stats(),
+        "atlas": atlas_cache.stats(),
+    }
 
 
 def load_image(path: str, height: int | None = None, width: int | None = None,
@@ -41,20 +108,71 @@ def load_image(path: str, height: int | None = None, width: int | None = None,
     :return: A PIL.Image loaded from specified path and processed according to args.
     """
 
-    if rotate < 0:
-        rotate = rotate + (360 * math.ceil(-rotate / 360))
-    rotate %= 360
-    rotate = math.floor(rotate)
+    rotate = __normalize_rotation(rotate)
 
     return __load_image(path=path, height=height, width=width,
                         flip_h=flip_h, flip_v=flip_v,
                         rotate=rotate, pivot=pivot)
 
 
-@cache
+def prefetch_image(path: str, height: int | None = None, width: int | None = None,
+                   flip_h: bool = False, flip_v: bool = False,
+                   rotate: int = 0, pivot: Tuple[int, int] | None = None) -> Future | None:
+    """
+    Start preparing an image on asset_pool, arguments are the same as for load_image().
+    Later load_image() or load_photo() of the same image waits for the prepared image instead of processing it again.
+    :return: Future of the prepared image, or None if the image is already cached.
+    """
+    rotate = __normalize_rotation(rotate)
+    key = (path, height, width, flip_h, flip_v, rotate, pivot)
+    if key in image_cache:
+        return None
+    with _pending_lock:
+        future = _pending_images.get(key)
+        if future is None:
+            future = asset_pool.submit(__prepare_image, key)
+            _pending_images[key] = future
+    return future
+
+
+def __normalize_rotation(rotate: float) -> int:
+    if rotate < 0:
+        rotate = rotate + (360 * math.ceil(-rotate / 360))
+    rotate %= 360
+    return math.floor(rotate)
+
+
+def __prepare_image(key: tuple) -> Image:
+    try:
+        image = __create_image(*key)
+        image_cache.put(key, image)
+        return image
+    finally:
+        with _pending_lock:
+            _pending_images.pop(key, None)
+
+
 def __load_image(path: str, height: int | None = None, width: int | None = None,
                  flip_h: bool = False, flip_v: bool = False,
                  rotate: int = 0, pivot: Tuple[int, int] | None = None) -> Image:
+    key = (path, height, width, flip_h, flip_v, rotate, pivot)
+    image = image_cache.get(key)
+    if image is None:
+        with _pending_lock:
+            future = _pending_images.get(key)
+        if future is not None:
+            with profiler.section("image_wait"):
+                return future.result()
+        profiler.count("image_cache_miss")
+        with profiler.section("image_create"):
+            image = __create_image(path, height, width, flip_h, flip_v, rotate, pivot)
+        image_cache.put(key, image)
+    return image
+
+
+def __create_image(path: str, height: int | None = None, width: int | None = None,
+                   flip_h: bool = False, flip_v: bool = False,
+                   rotate: int = 0, pivot: Tuple[int, int] | None = None) -> Image:
     assert rotate >= 0
     assert rotate < 360
     assert rotate % 1 == 0
@@ -104,25 +222,127 @@ def load_photo(path: str, height: int | None = None, width: int | None = None,
     where (0,0) is the top left corner of image.
     :return: A tk.PhotoImage loaded from specified path and processed according to args.
     """
-    if rotate < 0:
-        rotate = rotate + (360 * math.ceil(-rotate / 360))
-    rotate %= 360
-    rotate = math.floor(rotate)
+    rotate = __normalize_rotation(rotate)
 
     return __load_photo(path=path, height=height, width=width,
                         flip_h=flip_h, flip_v=flip_v,
                         rotate=rotate, pivot=pivot)
 
 
-@cache
+def load_photo_async(path: str, height: int | None = None, width: int | None = None,
+                     flip_h: bool = False, flip_v: bool = False,
+                     rotate: int = 0, pivot: Tuple[int, int] | None = None,
+                     callback: Callable[[tk.PhotoImage], None] | None = None) -> tk.PhotoImage | None:
+    """
+    Load an image as PhotoImage without blocking on image processing, arguments are the same as for load_photo().
+    If the image is not prepared yet, it is processed on asset_pool and callback is later called on the Tk thread.
+    If asset_pool is not bound to the app, the photo is loaded synchronously.
+    :return: The photo if it is available right away, otherwise None.
+    """
+    rotate = __normalize_rotation(rotate)
+    key = (path, height, width, flip_h, flip_v, rotate, pivot)
+    photo = photo_cache.get(key)
+    if photo is not None:
+        return photo
+
+    future = prefetch_image(path, height, width, flip_h, flip_v, rotate, pivot) if asset_pool.bound else None
+    if future is None:
+        return __load_photo(path, height, width, flip_h, flip_v, rotate, pivot)
+
+    def on_prepared(_: Image.Image):
+        photo = __load_photo(path, height, width, flip_h, flip_v, rotate, pivot)
+        if callback is not None:
+            callback(photo)
+
+    asset_pool.when_done(future, on_prepared)
+    return None
+
+
 def __load_photo(path: str, height: int | None = None, width: int | None = None,
                  flip_h: bool = False, flip_v: bool = False,
                  rotate: int = 0, pivot: Tuple[int, int] | None = None) -> tk.PhotoImage:
-    image = load_image(path, height, width, flip_h, flip_v, rotate, pivot)
-    photo = ImageTk.PhotoImage(image)
+    key = (path, height, width, flip_h, flip_v, rotate, pivot)
+    photo = photo_cache.get(key)
+    if photo is None:
+        profiler.count("photo_cache_miss")
+        image = load_image(path, height, width, flip_h, flip_v, rotate, pivot)
+        with profiler.section("photo_create"):
+            photo = make_photo(image)
+        photo_cache.put(key, photo)
     return photo
 
 
+class RotationAtlas:
+    """
+    Sprite pre-rendered at evenly spaced angles, a photo per angle.
+    All rotation work is done when the atlas is built, afterwards picking a rotation is just a lookup
+    of the nearest frame.
+    """
+
+    def __init__(self, image: Image.Image, step: float, pivot: Tuple[int, int] | None = None):
+        """
+        :param image: Unrotated sprite.
+        :param step: Requested angle between neighbouring frames in degrees,
+        adjusted so that frames cover the full circle evenly.
+        :param pivot: Pivot point around which to rotate image, see load_image().
+        """
+        self.width = image.width
+        """Width of the unrotated sprite"""
+        self.height = image.height
+        """Height of the unrotated sprite"""
+        self.count = max(1, round(360 / step))
+        """Number of frames"""
+        self.step = 360 / self.count
+        """Angle between neighbouring frames in degrees"""
+
+        frames = [image.rotate(i * self.step, expand=True, center=pivot) for i in range(self.count)]
+        self._nbytes = sum(frame.width * frame.height * 4 for frame in frames)
+        self._photos: List[tk.PhotoImage] = [make_photo(frame) for frame in frames]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the frame photos"""
+        return self._nbytes
+
+    def index(self, degrees: float) -> int:
+        """Get index of the frame nearest to the specified counter-clockwise rotation in degrees."""
+        return round(degrees / self.step) % self.count
+
+    def quantize(self, degrees: float) -> float:
+        """Get rotation of the frame nearest to the specified rotation in degrees."""
+        return round(degrees / self.step) * self.step
+
+    def frame(self, degrees: float) -> tk.PhotoImage:
+        """Get photo of the frame nearest to the specified counter-clockwise rotation in degrees."""
+        return self._photos[self.index(degrees)]
+
+
+def load_atlas(path: str, height: int | None = None, width: int | None = None,
+               flip_h: bool = False, flip_v: bool = False,
+               step: float = 1, pivot: Tuple[int, int] | None = None) -> RotationAtlas:
+    """
+    Load an image and pre-render it rotated by multiples of step into a RotationAtlas.
+    Use cached atlas if available.
+    :param path: Relative path to image
+    :param height: Target height in pixels to resize to, or None, see load_image().
+    :param width: Target width in pixels to resize to, or None, see load_image().
+    :param flip_h: Whether to _flip image horizontally.
+    :param flip_v: Whether to _flip image vertically.
+    :param step: Angle between neighbouring frames in degrees.
+    :param pivot: Pivot point around which to rotate image in form of tuple (x,y)
+    where (0,0) is the top left corner of image.
+    :return: A RotationAtlas of the processed image.
+    """
+    key = (path, height, width, flip_h, flip_v, step, pivot)
+    atlas = atlas_cache.get(key)
+    if atlas is None:
+        profiler.count("atlas_cache_miss")
+        with profiler.section("atlas_create"):
+            atlas = RotationAtlas(load_image(path, height, width, flip_h, flip_v), step, pivot)
+        atlas_cache.put(key, atlas)
+    return atlas
+
+
 def as_image(image: np.ndarray, mode: Literal["L", "RGB", "RGBA"] = None) -> PIL.Image.Image:
     """
     Convert numpy ndarray into a PIL.Image
@@ -134,13 +354,10 @@ def as_image(image: np.ndarray, mode: Literal["L", "RGB", "RGBA"] = None) -> PIL
     """
     if mode is None:
         if image.ndim == 2:
-            print("to image gray")
             return Image.fromarray(image.astype(np.uint8), mode="L")
         elif image.ndim == 3 and image.shape[2] == 3:
-            print("to image rgb")
             return Image.fromarray(image.astype(np.uint8), mode="RGB")
         elif image.ndim == 3 and image.shape[2] == 4:
-            print("to image rgba")
             return Image.fromarray(image.astype(np.uint8), mode="RGBA")
         else:
             raise ValueError(
@@ -158,21 +375,24 @@ def as_photo(image: np.ndarray, mode: Literal["L", "RGB", "RGBA"] = None) -> tk.
 
     **Warning**: Make sure photo object is saved in variable to avoid GC clean (and nothing showing up).
     """
-    if mode is None:
-        if image.ndim == 2:
-            print("to image gray")
-            return ImageTk.PhotoImage(image=Image.fromarray(image.astype(np.uint8), mode="L"))
-        elif image.ndim == 3 and image.shape[2] == 3:
-            print("to image rgb")
-            return ImageTk.PhotoImage(image=Image.fromarray(image.astype(np.uint8), mode="RGB"))
-        elif image.ndim == 3 and image.shape[2] == 4:
-            print("to image rgba")
-            return ImageTk.PhotoImage(image=Image.fromarray(image.astype(np.uint8), mode="RGBA"))
-        else:
-            raise ValueError(
-                f"Unexpected image of shape {image.shape}, should be either 2D, or 3D with last dim of _size 3 or 4")
-    else:
-        return ImageTk.PhotoImage(image=Image.fromarray(image.astype(np.uint8), mode=mode))
+    return make_photo(as_image(image, mode))
+
+
+def paste_photo(photo: tk.PhotoImage, image: np.ndarray, x: int, y: int):
+    """
+    Overwrite a rectangular region of an existing photo by a RGBA ndarray, including its transparency.
+    Only the region is transferred to Tk, which is far cheaper than converting the whole image via as_photo().
+    :param photo: Photo to be updated in place, either tk.PhotoImage or ImageTk.PhotoImage.
+    :param image: Ndarray of shape (h, w, 4) and dtype uint8 with the new content of the region.
+    :param x: X coordinate of top left corner of the region within photo.
+    :param y: Y coordinate of top left corner of the region within photo.
+    """
+    region = Image.fromarray(np.ascontiguousarray(image, dtype=np.uint8))
+    if isinstance(photo, HeadlessPhoto):
+        photo.image.paste(region, (x, y))
+        return
+    region = ImageTk.PhotoImage(image=region)
+    photo.tk.call(str(photo), "copy", str(region), "-to", x, y, "-compositingrule", "set")
 
 
 def rotate_vec(vector: Vector2, angle: float) -> (float, float):